@@ -0,0 +1,169 @@
+# backjump.py - Procura com conflict-directed backjumping e nogoods aprendidos
+#
+# Como o BacktrackSolver, mexe sempre no mesmo Board com apply/undo e escolhe
+# a região com menos colocações vivas (board.smallest_domain). Cada nível
+# guarda o seu conjunto de conflito: os níveis anteriores que explicam as
+# colocações da sua região que falharam. Quando as colocações de uma região se
+# esgotam, a procura volta diretamente ao nível mais recente do conjunto (em
+# vez do anterior), que herda o resto do conjunto, e as colocações desses
+# níveis ficam registadas como nogood: não podem voltar a estar todas no
+# tabuleiro ao mesmo tempo.
+#
+# Uma colocação q só pode ser invalidada (sobreposição, letra igual encostada
+# ou bloco 2x2 cheio) por peças que ocupem células de q ou vizinhas (em 8
+# direções) de q. Por isso, se uma região fica sem colocações, os culpados são
+# os níveis cujas peças tocam o halo da região: a união dessas células para
+# todas as colocações que a região tinha no início. Quando as peças deixam de
+# se poder ligar, os culpados são as peças que connectivity.separation aponta:
+# as do lado alcançado e as que o fecham.
+
+import collections
+
+from bitboard import connects
+from connectivity import can_still_connect, separation
+import tracing
+
+_trace = tracing.channel('search')
+
+
+def _key(placement):
+    return placement.region, placement.index
+
+
+class NogoodStore:
+    """Nogoods aprendidos (conjuntos de colocações que não podem estar todas no
+    tabuleiro), no máximo max_size: quando enche sai o usado há mais tempo."""
+
+    def __init__(self, max_size=2000):
+        self.max_size = max_size
+        self.nogoods = collections.OrderedDict()
+        self.watch = collections.defaultdict(set)
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def add(self, nogood):
+        nogood = frozenset(nogood)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for key in nogood:
+            self.watch[key].add(nogood)
+        if len(self.nogoods) > self.max_size:
+            oldest, _ = self.nogoods.popitem(last=False)
+            for key in oldest:
+                self.watch[key].discard(oldest)
+            self.evictions += 1
+
+    def check(self, key, assigned):
+        """Um nogood com key cujas outras colocações estão todas em assigned, ou None."""
+        for nogood in self.watch.get(key, ()):
+            if all(other == key or other in assigned for other in nogood):
+                self.hits += 1
+                self.nogoods.move_to_end(nogood)
+                return nogood
+        return None
+
+
+class BackjumpSolver:
+    def __init__(self, problem, max_nogoods=2000):
+        self.problem = problem
+        self.nogoods = NogoodStore(max_nogoods)
+        self.nodes = 0
+        self.jumps = 0
+
+    def solve(self, state):
+        """Procura a partir de state (alterando state.board no próprio sítio).
+        Devolve o Board resolvido ou None se não houver solução."""
+        problem = self.problem
+        board = state.board
+        self.nodes += 1
+        if problem.goal_test(state):
+            return board
+        if board.empty_domains or not board.unfilled or not can_still_connect(board):
+            return None
+        self.halo = self._halos(board)
+        placed = []
+        level_of = {}
+        frames = [self._frame(board)]
+        while frames:
+            depth = len(placed)
+            region, candidates, conflict = frames[-1]
+            for placement in candidates:
+                key = _key(placement)
+                nogood = self.nogoods.check(key, level_of)
+                if nogood is not None:
+                    conflict.update(level_of[other] for other in nogood if other != key)
+                    continue
+                board.apply(placement)
+                if board.empty_domains:
+                    for other in board.graph.neighbours[placement.region]:
+                        if not board.alive[other]:
+                            conflict |= self._culprits(placed, other)
+                    board.undo()
+                    continue
+                self.nodes += 1
+                if problem.goal_test(state):
+                    return board
+                if not can_still_connect(board):
+                    levels = {piece.region: level for level, piece in enumerate(placed)}
+                    conflict.update(levels[region] for region in separation(board) if region in levels)
+                elif not board.unfilled:
+                    conflict.update(range(depth))
+                else:
+                    placed.append(placement)
+                    level_of[key] = depth
+                    frames.append(self._frame(board))
+                    break
+                board.undo()
+            else:
+                # Região esgotada: também contam os níveis que lhe tiraram colocações
+                conflict |= self._culprits(placed, region)
+                if not conflict:
+                    return None
+                target = max(conflict)
+                self.nogoods.add(_key(placed[level]) for level in conflict)
+                if _trace.debug:
+                    _trace.emit("backjump do nível %d para o %d", depth, target)
+                self.jumps += depth - 1 - target
+                while len(placed) > target:
+                    board.undo()
+                    del level_of[_key(placed.pop())]
+                del frames[target + 1:]
+                conflict.discard(target)
+                frames[target][2].update(conflict)
+        return None
+
+    @staticmethod
+    def _halos(board):
+        """Região -> células das suas colocações vivas e das vizinhas destas."""
+        bits, catalogue = board.bits, board.catalogue
+        halos = {}
+        for region, alive in board.alive.items():
+            halo = 0
+            for placement in catalogue.alive(region, alive):
+                halo |= placement.mask | bits.neighbours8(placement.mask)
+            halos[region] = halo
+        return halos
+
+    def _culprits(self, placed, region):
+        """Níveis cujas peças podem ter tirado colocações à região."""
+        halo = self.halo[region]
+        return {level for level, placement in enumerate(placed) if placement.mask & halo}
+
+    @staticmethod
+    def _frame(board):
+        """(região, colocações por tentar, conjunto de conflito) para o nível
+        seguinte, com as colocações pela ordem de Nuruomino.iter_actions."""
+        region = board.smallest_domain()
+        bits, occupied = board.bits, board.occupied
+        connected, disconnected = [], []
+        for placement in reversed(list(board.catalogue.alive(region, board.alive[region]))):
+            if not occupied or connects(bits, placement.mask, occupied):
+                connected.append(placement)
+            else:
+                disconnected.append(placement)
+        return region, iter(connected + disconnected), set()
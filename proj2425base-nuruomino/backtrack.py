@@ -0,0 +1,37 @@
+# backtrack.py - Procura em profundidade com apply/undo sobre um único tabuleiro
+#
+# Em vez de guardar um Node e um Board por cada entrada da fronteira, o motor
+# mexe sempre no mesmo Board (board.apply / board.undo) e guarda em cada nível
+# apenas o iterador das ações que faltam experimentar (problem.iter_actions,
+# que pode gerá-las a pedido). As ações são tentadas pela mesma ordem em que
+# depth_first_tree_search as retira da pilha (da última para a primeira), por
+# isso a solução encontrada é a mesma.
+
+
+class BacktrackSolver:
+    def __init__(self, problem):
+        self.problem = problem
+        self.nodes = 0
+
+    def solve(self, state):
+        """Procura a partir de state (alterando state.board no próprio sítio).
+        Devolve o Board resolvido ou None se não houver solução."""
+        problem = self.problem
+        board = state.board
+        self.nodes += 1
+        if problem.goal_test(state):
+            return board
+        stack = [problem.iter_actions(state)]
+        while stack:
+            for action in stack[-1]:
+                board.apply(action)
+                self.nodes += 1
+                if problem.goal_test(state):
+                    return board
+                stack.append(problem.iter_actions(state))
+                break
+            else:
+                stack.pop()
+                if stack:
+                    board.undo()
+        return None
@@ -0,0 +1,180 @@
+# batch.py - Resolve muitos puzzles em paralelo e verifica os resultados
+#
+# Uso:
+#     python3 batch.py ../public ../sample-nuruominoboards
+#     python3 batch.py '../public/*.txt' --method dlx --timeout 30 --jobs 4
+#
+# Cada puzzle corre num processo filho, no máximo --jobs ao mesmo tempo. O
+# limite de tempo é imposto pelo processo principal, que termina o filho de um
+# puzzle que o ultrapasse, por isso não depende de SIGALRM (que não existe no
+# Windows). A solução é verificada pelas regras (uma peça por região, sem 2x2,
+# sem peças iguais encostadas, tudo ligado) e comparada com o .out
+# correspondente quando existe. Uma solução válida mas diferente do .out fica
+# com o estado DIFF, que conta como falha; com --accept-valid passa a contar
+# como ok (a conetividade aqui é a de is_connected, em 8 direções, e por isso
+# há puzzles com mais soluções do que a do .out).
+
+import argparse
+import glob
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+
+from helpers import PIECES, has_duplicate_adjacent_pieces, has_filled_2x2_block, is_connected
+import teste
+
+
+def expand(patterns):
+    """Ficheiros de puzzle (.txt que não são soluções) de uma lista de pastas/globs."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*.txt')
+        for path in sorted(glob.glob(pattern)):
+            if path.endswith('.txt') and not path.endswith('.out.txt') and path not in found:
+                found.append(path)
+    return found
+
+
+def expected_path(path):
+    """Solução esperada de um puzzle: test04.txt -> test04.out, test-01.txt ->
+    test-01.out.txt ou test01.out.txt. None se não houver nenhuma."""
+    folder, name = os.path.split(path)
+    stem = name[:-len('.txt')]
+    for candidate in (stem, stem.replace('-', '')):
+        for suffix in ('.out', '.out.txt'):
+            full = os.path.join(folder, candidate + suffix)
+            if os.path.exists(full):
+                return full
+    return None
+
+
+def read_grid(path):
+    with open(path) as stream:
+        return [line.split() for line in stream if line.strip()]
+
+
+def is_valid(board):
+    """Verifica a solução pelas regras do puzzle, independentemente do motor."""
+    for cells in board.regions.values():
+        if sum(board.matrix[r][c] in PIECES for r, c in cells) != 4:
+            return False
+    return (not has_duplicate_adjacent_pieces(board) and
+            not has_filled_2x2_block(board) and
+            is_connected(board))
+
+
+def _report(path, status='ERROR', seconds=0.0, detail=''):
+    return {'puzzle': path, 'time': seconds, 'nodes': None, 'status': status, 'detail': detail}
+
+
+def run_one(job):
+    """Corre um puzzle (num processo filho). Devolve um dicionário com o resultado."""
+    path, method = job
+    report = _report(path)
+    stats = {}
+    start = time.perf_counter()
+    try:
+        solution = teste.solve(teste.Board(read_grid(path)), method, stats)
+        report['time'] = time.perf_counter() - start
+        report['nodes'] = stats.get('nodes')
+        if solution is None:
+            report['status'] = 'FAIL'
+            report['detail'] = 'sem solução'
+        elif not is_valid(solution):
+            report['status'] = 'FAIL'
+            report['detail'] = 'solução inválida'
+        else:
+            expected = expected_path(path)
+            report['status'] = 'ok'
+            if expected is None:
+                report['detail'] = 'sem .out'
+            elif read_grid(expected) == solution.matrix:
+                report['detail'] = 'igual a ' + os.path.basename(expected)
+            else:
+                report['status'] = 'DIFF'
+                report['detail'] = 'válida, diferente de ' + os.path.basename(expected)
+    except Exception as error:
+        report['time'] = time.perf_counter() - start
+        report['detail'] = f'{type(error).__name__}: {error}'
+    return report
+
+
+def _child(job, connection):
+    connection.send(run_one(job))
+    connection.close()
+
+
+def run_batch(paths, method='backtrack', timeout=60, jobs=None):
+    """Resolve cada puzzle num processo filho, no máximo jobs ao mesmo tempo, e
+    termina os que passarem de timeout segundos (0 ou None = sem limite).
+    Devolve os relatórios pela ordem de paths."""
+    jobs = jobs or os.cpu_count() or 1
+    reports = [None] * len(paths)
+    waiting = list(enumerate(paths))[::-1]
+    running = {}
+    while waiting or running:
+        while waiting and len(running) < jobs:
+            index, path = waiting.pop()
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            child = multiprocessing.Process(target=_child, args=((path, method), sender))
+            child.start()
+            # Só o filho fica com a ponta de escrita: se morrer sem responder, recv dá EOFError
+            sender.close()
+            running[receiver] = (index, path, child, time.perf_counter())
+        wait = None
+        if timeout:
+            first = min(start for _, _, _, start in running.values())
+            wait = max(0.0, first + timeout - time.perf_counter())
+        for receiver in multiprocessing.connection.wait(list(running), wait):
+            index, path, child, start = running.pop(receiver)
+            try:
+                reports[index] = receiver.recv()
+            except EOFError:
+                reports[index] = _report(path, seconds=time.perf_counter() - start,
+                                         detail="o processo terminou sem resultado")
+            receiver.close()
+            child.join()
+        now = time.perf_counter()
+        for receiver, (index, path, child, start) in list(running.items()):
+            if timeout and now - start >= timeout:
+                child.terminate()
+                child.join()
+                receiver.close()
+                del running[receiver]
+                reports[index] = _report(path, 'TIMEOUT', now - start)
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve puzzles Nuruomino em paralelo.")
+    parser.add_argument('inputs', nargs='+', help="pastas ou globs com os .txt dos puzzles")
+    parser.add_argument('--method', default='backtrack', choices=sorted(teste.SOLVERS))
+    parser.add_argument('--timeout', type=float, default=60, help="segundos por puzzle (0 = sem limite)")
+    parser.add_argument('--jobs', type=int, default=None, help="processos (por omissão, um por núcleo)")
+    parser.add_argument('--accept-valid', action='store_true',
+                        help="uma solução válida diferente do .out (DIFF) conta como ok")
+    args = parser.parse_args(argv)
+
+    paths = expand(args.inputs)
+    if not paths:
+        parser.error("nenhum puzzle encontrado")
+    start = time.perf_counter()
+    reports = run_batch(paths, args.method, args.timeout, args.jobs)
+    elapsed = time.perf_counter() - start
+
+    width = max(len(report['puzzle']) for report in reports)
+    for report in reports:
+        nodes = '-' if report['nodes'] is None else report['nodes']
+        print(f"{report['puzzle']:<{width}}  {report['status']:<7}  {report['time']:8.3f}s  "
+              f"{nodes:>8} nós  {report['detail']}")
+    passing = ('ok', 'DIFF') if args.accept_valid else ('ok',)
+    failed = sum(report['status'] not in passing for report in reports)
+    print(f"{len(reports) - failed}/{len(reports)} ok em {elapsed:.3f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
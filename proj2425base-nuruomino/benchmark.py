@@ -0,0 +1,236 @@
+# benchmark.py - Medições de desempenho com baselines em JSON
+#
+# Uso:
+#     python3 benchmark.py --save baseline.json
+#     python3 benchmark.py --compare baseline.json --tolerance 0.25
+#     python3 benchmark.py ../public/test05.txt --pipeline teste:dlx --repeat 5
+#     python3 benchmark.py ../sample-nuruominoboards --pipeline nuruomino:dfs --timeout 10
+#     python3 benchmark.py --check
+#
+# Cada puzzle passa pelo pipeline escolhido (teste:<motor> ou nuruomino:dfs)
+# através de um search.InstrumentedProblem, que conta as chamadas a actions,
+# result e goal_test. Regista-se o menor tempo de --repeat execuções, os nós
+# expandidos (os do motor, ou os goal tests quando o motor não os conta) e o
+# pico de memória, este numa execução à parte com tracemalloc para não
+# estragar os tempos. Os puzzles correm em série, no mesmo processo, e o
+# --timeout usa SIGALRM: onde este não existe (Windows) os puzzles correm sem
+# limite de tempo.
+#
+# Com --compare, cada valor é comparado com o da baseline: o tempo e a memória
+# podem piorar até --tolerance / --memory-tolerance (fração), os contadores até
+# --count-tolerance (0 por omissão: qualquer nó a mais é regressão).
+
+import argparse
+import contextlib
+import json
+import platform
+import signal
+import sys
+import time
+import tracemalloc
+
+from search import InstrumentedProblem, depth_first_tree_search
+from batch import expand, read_grid
+import nuruomino
+import teste
+
+DEFAULT_INPUTS = ['../public', '../sample-nuruominoboards']
+# nuruomino:dfs esgota o tempo em quase todos os puzzles públicos, e os
+# timeouts não entram na comparação: só se corre quando é pedido, por exemplo
+# só nos exemplos (ver o uso acima)
+DEFAULT_PIPELINES = ['teste:backtrack']
+COUNTERS = ('nodes', 'goal_tests', 'succs', 'states')
+# Pipelines que têm de explorar árvores diferentes no mesmo puzzle: nós iguais
+# querem dizer que a opção do segundo não chegou ao problema (--check)
+DISTINCT = [('../public/test09.txt', 'teste:backtrack', 'teste:lcv')]
+
+
+class PuzzleTimeout(Exception):
+    pass
+
+
+def _alarm(signum, frame):
+    raise PuzzleTimeout()
+
+
+@contextlib.contextmanager
+def time_limit(seconds, repeat=0.1):
+    """Lança PuzzleTimeout se o bloco demorar mais de seconds (0 ou None = sem
+    limite) e, depois disso, de repeat em repeat segundos até o bloco acabar.
+    Sem SIGALRM o bloco corre sem limite."""
+    if not seconds or not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds, repeat)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# O Board usa a matriz que recebe (e preenche-a), por isso cada execução
+# recebe uma cópia da grelha lida.
+
+def _prepare_teste(grid):
+    problem = teste.Nuruomino(teste.Board([row[:] for row in grid]))
+    instrumented = InstrumentedProblem(problem)
+    problem.initial = teste.apply_forced_moves(instrumented, problem.initial)
+    return instrumented
+
+
+def _prepare_nuruomino(grid):
+    problem = nuruomino.Nuruomino(nuruomino.Board([row[:] for row in grid]))
+    instrumented = InstrumentedProblem(problem)
+    problem.initial = nuruomino.apply_forced_moves(instrumented, problem.initial)
+    return instrumented
+
+
+def _nuruomino_dfs(instrumented):
+    goal_node = depth_first_tree_search(instrumented)
+    return goal_node.state.board if goal_node else None
+
+
+def pipeline(name):
+    """'teste:dlx' -> (função que prepara o problema instrumentado, motor)."""
+    module, _, method = name.partition(':')
+    if module == 'teste':
+        return _prepare_teste, teste.SOLVERS[method or 'backtrack']
+    if module == 'nuruomino' and method in ('', 'dfs'):
+        return _prepare_nuruomino, _nuruomino_dfs
+    raise ValueError(f"pipeline desconhecido: {name}")
+
+
+def measure(path, name, repeat=1, timeout=60, memory=True):
+    """Mede um puzzle num pipeline. Devolve um dicionário com os resultados."""
+    prepare, run = pipeline(name)
+    grid = read_grid(path)
+    result = {'status': 'ok', 'time': None, 'peak_kb': None}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        instrumented = None
+        try:
+            # O alarme repete-se porque o "except:" de Nuruomino.actions em
+            # nuruomino.py engole o primeiro PuzzleTimeout (e os seguintes que lá
+            # caiam): nuruomino:dfs só pára quando um alarme chega fora dele
+            with time_limit(timeout):
+                instrumented = prepare(grid)
+                solution = run(instrumented)
+            if solution is None:
+                result['status'] = 'FAIL'
+        except PuzzleTimeout:
+            result['status'] = 'TIMEOUT'
+        elapsed = time.perf_counter() - start
+        if result['time'] is None or elapsed < result['time']:
+            result['time'] = elapsed
+        if result['status'] != 'ok':
+            break
+    counts = vars(instrumented) if instrumented else {}
+    result['goal_tests'] = counts.get('goal_tests', 0)
+    result['succs'] = counts.get('succs', 0)
+    result['states'] = counts.get('states', 0)
+    result['nodes'] = counts.get('nodes', result['goal_tests'])
+    if memory and result['status'] == 'ok':
+        tracemalloc.start()
+        try:
+            # Alarme repetido pela mesma razão que acima
+            with time_limit(timeout):
+                run(prepare(grid))
+            result['peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        except PuzzleTimeout:
+            pass
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(paths, pipelines, repeat=1, timeout=60, memory=True):
+    results = {}
+    for name in pipelines:
+        for path in paths:
+            results[f"{name} {path}"] = measure(path, name, repeat, timeout, memory)
+    return results
+
+
+def compare(baseline, results, tolerance=0.25, memory_tolerance=0.25,
+            count_tolerance=0.0, min_time=0.005):
+    """Lista de regressões (texto) de results em relação a baseline."""
+    regressions = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if old['status'] == 'ok' and new['status'] != 'ok':
+            regressions.append(f"{key}: {old['status']} -> {new['status']}")
+            continue
+        if old['status'] != 'ok' or new['status'] != 'ok':
+            # Com timeouts os contadores e o tempo não são comparáveis
+            continue
+        if new['time'] > old['time'] * (1 + tolerance) and new['time'] - old['time'] > min_time:
+            regressions.append(f"{key}: tempo {old['time']:.4f}s -> {new['time']:.4f}s")
+        for counter in COUNTERS:
+            if new[counter] > old[counter] * (1 + count_tolerance):
+                regressions.append(f"{key}: {counter} {old[counter]} -> {new[counter]}")
+        if old['peak_kb'] and new['peak_kb'] and new['peak_kb'] > old['peak_kb'] * (1 + memory_tolerance):
+            regressions.append(f"{key}: memória {old['peak_kb']} KiB -> {new['peak_kb']} KiB")
+    return regressions
+
+
+def check_distinct(pairs=DISTINCT, timeout=60):
+    """Lista de falhas (texto): pares de pipelines com o mesmo nº de nós."""
+    failures = []
+    for path, first, second in pairs:
+        nodes = [measure(path, name, 1, timeout, memory=False)['nodes'] for name in (first, second)]
+        if nodes[0] == nodes[1]:
+            failures.append(f"{path}: {first} e {second} exploram os mesmos {nodes[0]} nós")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de procura do Nuruomino.")
+    parser.add_argument('inputs', nargs='*', default=DEFAULT_INPUTS, help="pastas ou globs com os puzzles")
+    parser.add_argument('--pipeline', action='append', dest='pipelines',
+                        help="teste:<motor> ou nuruomino:dfs (pode repetir-se)")
+    parser.add_argument('--repeat', type=int, default=3, help="execuções por puzzle (fica o menor tempo)")
+    parser.add_argument('--timeout', type=float, default=60, help="segundos por execução (0 = sem limite)")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="não medir a memória")
+    parser.add_argument('--save', metavar='FICHEIRO', help="guardar os resultados como baseline")
+    parser.add_argument('--compare', metavar='FICHEIRO', help="comparar com uma baseline guardada")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--count-tolerance', type=float, default=0.0)
+    parser.add_argument('--check', action='store_true',
+                        help="só verificar que os pipelines de DISTINCT exploram árvores diferentes")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check_distinct(timeout=args.timeout)
+        for failure in failures:
+            print("FALHA", failure)
+        print(f"{len(failures)} falhas em {len(DISTINCT)} verificações")
+        return 1 if failures else 0
+
+    paths = expand(args.inputs)
+    results = run_suite(paths, args.pipelines or DEFAULT_PIPELINES, args.repeat, args.timeout, args.memory)
+    for key, result in results.items():
+        peak = '-' if result['peak_kb'] is None else result['peak_kb']
+        print(f"{key:<50} {result['status']:<7} {result['time']:8.4f}s {result['nodes']:>8} nós "
+              f"{result['goal_tests']:>8} goal tests {peak:>8} KiB")
+
+    if args.save:
+        with open(args.save, 'w') as stream:
+            json.dump({'python': platform.python_version(), 'results': results}, stream, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = json.load(stream)['results']
+        regressions = compare(baseline, results, args.tolerance, args.memory_tolerance, args.count_tolerance)
+        for regression in regressions:
+            print("REGRESSÃO", regression)
+        print(f"{len(regressions)} regressões em relação a {args.compare}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# bitboard.py - Representação do tabuleiro em bitmasks (inteiros Python)
+#
+# A célula (r, c) corresponde ao bit r * stride + c, com stride = size + 1.
+# A coluna extra (c == size) nunca é usada: funciona como guarda, para que os
+# deslocamentos de 1 bit não passem de uma linha para a seguinte.
+
+_GEOMETRIES = {}
+
+
+def geometry(size):
+    """Devolve a BitGeometry partilhada para tabuleiros size x size."""
+    geom = _GEOMETRIES.get(size)
+    if geom is None:
+        geom = _GEOMETRIES[size] = BitGeometry(size)
+    return geom
+
+
+class BitGeometry:
+    def __init__(self, size):
+        self.size = size
+        self.stride = size + 1
+        row = (1 << size) - 1
+        self.full = 0
+        for r in range(size):
+            self.full |= row << (r * self.stride)
+
+    def bit(self, r, c):
+        return 1 << (r * self.stride + c)
+
+    def mask_of(self, coords):
+        mask = 0
+        for r, c in coords:
+            mask |= 1 << (r * self.stride + c)
+        return mask
+
+    def cells(self, mask):
+        stride = self.stride
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            yield divmod(index, stride)
+            mask ^= low
+
+    def neighbours8(self, mask):
+        """Células adjacentes a mask em todas as direções, incluindo diagonais."""
+        s = self.stride
+        row = mask | (mask << 1) | (mask >> 1)
+        return (row | (row << s) | (row >> s)) & self.full & ~mask
+
+
+def connects(geom, mask, occupied):
+    """Versão em bitmask de connects_to_existing."""
+    return geom.neighbours8(mask) & occupied
@@ -0,0 +1,135 @@
+# bulk.py - Muitos puzzles num único processo, lidos e escritos em stream
+#
+# Uso:
+#     python3 bulk.py < puzzles.txt > solucoes.txt
+#     cat ../public/test0*.txt | python3 bulk.py --method cbj --jobs 4
+#
+# A entrada tem vários puzzles seguidos, no formato dos .txt, separados por
+# linhas em branco. Em alternativa, um puzzle pode vir precedido de uma linha
+# só com o seu tamanho N, e então são as N linhas seguintes (sem precisar de
+# linha em branco). Os dois formatos podem misturar-se.
+#
+# As soluções saem pela mesma ordem, separadas por uma linha em branco, e
+# cada uma é escrita (e o stdout despejado) assim que fica resolvida. Um
+# puzzle sem solução dá a linha "sem solução" no lugar da grelha. Uma entrada
+# mal formada pára a leitura: as soluções anteriores ficam escritas, o número
+# do puzzle e da linha vão para stderr e o código de saída é 2.
+#
+# O parser lê bytes: cada linha é partida com bytes.split() e cada token passa
+# a str uma única vez, numa tabela partilhada por todos os puzzles (os números
+# das regiões repetem-se muito). As células ficam strings porque o Board
+# compara-as com as letras das peças e escreve-as tal como as leu.
+
+import argparse
+import multiprocessing
+import sys
+
+import teste
+
+NO_SOLUTION = "sem solução"
+
+
+def read_grids(stream):
+    """Gera as grelhas (listas de linhas de str) de um stream binário, à medida
+    que cada uma acaba de ser lida. Uma entrada mal formada dá ValueError com o
+    número do puzzle (a contar de 1) e da linha."""
+    names = {}
+    rows = []
+    expected = None
+    index = 1
+    number = 0
+    for number, line in enumerate(stream, 1):
+        tokens = line.split()
+        if not tokens:
+            if expected is not None:
+                raise ValueError(f"puzzle {index}, linha {number}: "
+                                 f"o puzzle tinha {expected} linhas e acabou em {len(rows)}")
+            if rows:
+                yield _checked(rows, index, number)
+                index += 1
+                rows = []
+            continue
+        if not rows and expected is None and len(tokens) == 1:
+            # Um puzzle tem pelo menos 4 células, logo uma linha com um único
+            # token no início de um puzzle é o tamanho que o precede
+            if not tokens[0].isdigit():
+                raise ValueError(f"puzzle {index}, linha {number}: tamanho inválido {tokens[0].decode()!r}")
+            expected = int(tokens[0])
+            continue
+        rows.append([names.get(token) or names.setdefault(token, token.decode()) for token in tokens])
+        if expected is not None and len(rows) == expected:
+            yield _checked(rows, index, number)
+            index += 1
+            rows = []
+            expected = None
+    if expected is not None:
+        raise ValueError(f"puzzle {index}, fim do stream: o puzzle tinha {expected} linhas e acabou em {len(rows)}")
+    if rows:
+        yield _checked(rows, index, number)
+
+
+def _checked(rows, index, number):
+    size = len(rows)
+    for row in rows:
+        if len(row) != size:
+            raise ValueError(f"puzzle {index}, linha {number}: "
+                             f"o puzzle não é quadrado ({size} linhas, uma com {len(row)} colunas)")
+    return rows
+
+
+def write_grid(grid, stream):
+    stream.write("".join("\t".join(row) + "\n" for row in grid))
+
+
+def solve_grid(job):
+    """Resolve uma grelha (também num processo do pool). Devolve a matriz
+    solução ou None."""
+    grid, method = job
+    solution = teste.solve(teste.Board(grid), method)
+    return None if solution is None else solution.matrix
+
+
+def solve_stream(instream, outstream, method='backtrack', jobs=1):
+    """Resolve todos os puzzles de instream e escreve as soluções em outstream,
+    pela ordem da entrada e à medida que ficam prontas. Devolve (resolvidos, total)."""
+    work = ((grid, method) for grid in read_grids(instream))
+    solved = total = 0
+    if jobs == 1:
+        results = map(solve_grid, work)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(solve_grid, work)
+    try:
+        for matrix in results:
+            if total:
+                outstream.write("\n")
+            if matrix is None:
+                outstream.write(NO_SOLUTION + "\n")
+            else:
+                write_grid(matrix, outstream)
+                solved += 1
+            total += 1
+            outstream.flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return solved, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve um stream de puzzles Nuruomino.")
+    parser.add_argument('--method', default='backtrack', choices=sorted(teste.SOLVERS))
+    parser.add_argument('--jobs', type=int, default=1, help="processos (1 = tudo neste processo)")
+    args = parser.parse_args(argv)
+    try:
+        solved, total = solve_stream(sys.stdin.buffer, sys.stdout, args.method, args.jobs)
+    except ValueError as error:
+        # As soluções dos puzzles anteriores já foram escritas
+        sys.stderr.write(f"bulk.py: entrada mal formada: {error}\n")
+        return 2
+    return 0 if solved == total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# connectivity.py - Conetividade incremental das peças colocadas
+#
+# As peças (uma por região) formam um union-find guardado no Board (parent /
+# component_size, indexados pela região). Une-se por tamanho e nunca se
+# comprimem caminhos, por isso cada união muda só duas entradas e desfaz-se
+# pelo trail do Board como qualquer outra alteração.
+#
+# A adjacência é a mesma de is_connected em helpers.py (8 direções).
+
+
+def find(parent, region):
+    while parent[region] != region:
+        region = parent[region]
+    return region
+
+
+def join_piece(parent, component_size, bits, region_map, occupied, placement, assign):
+    """Une a componente da peça às das peças de occupied que lhe tocam (em 8
+    direções). As escritas passam por assign(contentor, chave, valor), para que
+    quem chama as possa desfazer. Devolve quantas componentes se juntaram."""
+    merged = 0
+    region = placement.region
+    for r, c in bits.cells(bits.neighbours8(placement.mask) & occupied):
+        a, b = find(parent, region), find(parent, region_map[r][c])
+        if a == b:
+            continue
+        if component_size[a] < component_size[b]:
+            a, b = b, a
+        assign(parent, b, a)
+        assign(component_size, a, component_size[a] + component_size[b])
+        merged += 1
+    return merged
+
+
+class RegionGraph:
+    """Máscara de cada região e regiões vizinhas (em 8 direções, as da
+    topology.Topology). Construído uma vez por puzzle."""
+
+    def __init__(self, topology, bits):
+        self.bits = bits
+        self.masks = {region_id: bits.mask_of(cells) for region_id, cells in topology.regions.items()}
+        self.neighbours = topology.adjacent
+
+
+def can_still_connect(board):
+    """Verifica se as componentes já colocadas ainda se podem juntar através
+    das regiões por preencher. Condição necessária: se falhar, nenhum
+    descendente deste estado pode ser um objetivo."""
+    if board.components <= 1:
+        return True
+    return _flood(board)[1] == board.placed
+
+
+def separation(board):
+    """Regiões preenchidas que explicam uma falha de can_still_connect: as que
+    se alcançam a partir da primeira peça e as vizinhas destas que a procura não
+    atravessa. Enquanto essas peças se mantiverem, as alcançadas nunca se ligam
+    às restantes, preencham-se como se preencherem as outras regiões."""
+    seen, _ = _flood(board)
+    filled, neighbours = board.region_filled, board.graph.neighbours
+    culprits = {region for region in seen if filled[region]}
+    for region in seen:
+        culprits.update(other for other in neighbours[region] if filled[other] and other not in seen)
+    return culprits
+
+
+def _flood(board):
+    """Regiões alcançáveis a partir da primeira peça colocada e nº de peças entre elas."""
+    masks, filled, occupied = board.graph.masks, board.region_filled, board.occupied
+    start = next(region for region in filled if filled[region])
+    return flood(board.graph, board.parent, start, lambda region: masks[region] & occupied, masks.__getitem__)
+
+
+def flood(graph, parent, start, piece, area):
+    """Regiões alcançáveis a partir da peça de start e nº de peças entre elas.
+    piece(região) é a máscara da peça colocada na região (0 se está livre) e
+    area(região) as células que uma região livre ainda pode ocupar."""
+    bits, masks, neighbours = graph.bits, graph.masks, graph.neighbours
+    seen = {start}
+    stack = [start]
+    placed_seen = 0
+    while stack:
+        region = stack.pop()
+        mask = piece(region)
+        if mask:
+            placed_seen += 1
+            reach = bits.neighbours8(mask)
+        else:
+            reach = bits.neighbours8(area(region))
+        for other in neighbours[region]:
+            if other in seen:
+                continue
+            other_mask = piece(other)
+            if other_mask:
+                # Uma peça fixa só é alcançada a partir de uma região livre que
+                # lhe toque, ou de uma peça da mesma componente.
+                if mask:
+                    if find(parent, region) != find(parent, other):
+                        continue
+                elif not reach & other_mask:
+                    continue
+            elif not reach & masks[other]:
+                continue
+            seen.add(other)
+            stack.append(other)
+    return seen, placed_seen
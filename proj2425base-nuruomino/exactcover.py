@@ -0,0 +1,251 @@
+# exactcover.py - Motor alternativo: Algorithm X com dancing links
+#
+# Cada linha é uma colocação viva do catálogo (as listas que saem de
+# get_all_valid_coords). As colunas primárias são as regiões por preencher:
+# cada uma tem de ser coberta exatamente uma vez. As colunas secundárias são
+# pares (aresta entre duas regiões, letra): uma colocação da letra X que
+# ocupa um dos lados da aresta remove todas as colocações de X que ocupam o
+# outro, o que impõe a regra das peças iguais encostadas. Há também uma
+# coluna secundária por (bloco 2x2, partição das suas células em duas metades):
+# duas peças de regiões diferentes que encheriam o bloco juntas ficam na mesma
+# coluna e excluem-se.
+#
+# O resto das regras verifica-se durante a procura: os blocos 2x2 que só
+# enchem com três ou mais peças com contadores por bloco (como no Board) e a
+# conetividade com o union-find do Board (connectivity.join_piece) sobre as
+# peças escolhidas, que fica em O(1) quando todas as regiões estão cobertas.
+# Enquanto houver mais de uma componente, cada escolha verifica ainda se as
+# componentes se podem juntar (connectivity.flood), com cada região por cobrir
+# limitada às células das linhas que restam na sua coluna.
+
+from connectivity import flood, join_piece
+
+
+class DancingLinks:
+    def __init__(self, primary, secondary, rows):
+        """primary/secondary: listas de chaves de coluna; rows: listas de
+        chaves de coluna de cada linha."""
+        columns = len(primary) + len(secondary)
+        self.L = list(range(-1, columns))
+        self.R = list(range(1, columns + 2))
+        self.L[0], self.R[len(primary)] = len(primary), 0
+        self.U = list(range(columns + 1))
+        self.D = list(range(columns + 1))
+        self.C = list(range(columns + 1))
+        self.S = [0] * (columns + 1)
+        self.row_of = [None] * (columns + 1)
+        # As colunas secundárias não entram na lista do cabeçalho
+        for header in range(len(primary) + 1, columns + 1):
+            self.L[header] = self.R[header] = header
+        index = {key: i + 1 for i, key in enumerate(list(primary) + list(secondary))}
+        for row, keys in enumerate(rows):
+            first = None
+            for key in keys:
+                self._add_node(index[key], row, first)
+                if first is None:
+                    first = len(self.C) - 1
+
+    def _add_node(self, column, row, first):
+        node = len(self.C)
+        self.C.append(column)
+        self.row_of.append(row)
+        self.U.append(self.U[column])
+        self.D.append(column)
+        self.D[self.U[column]] = node
+        self.U[column] = node
+        self.S[column] += 1
+        if first is None:
+            self.L.append(node)
+            self.R.append(node)
+        else:
+            self.L.append(self.L[first])
+            self.R.append(first)
+            self.R[self.L[first]] = node
+            self.L[first] = node
+
+    def cover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[column]], L[R[column]] = R[column], L[column]
+        i = D[column]
+        while i != column:
+            j = R[i]
+            while j != i:
+                D[U[j]], U[D[j]] = D[j], U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, column):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[column]
+        while i != column:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[column]] = L[R[column]] = column
+
+    def choose(self):
+        """Coluna primária com menos linhas (heurística S de Knuth); 0 se já não houver."""
+        R, S = self.R, self.S
+        best, best_size = 0, None
+        column = R[0]
+        while column:
+            if best_size is None or S[column] < best_size:
+                best, best_size = column, S[column]
+                if not best_size:
+                    break
+            column = R[column]
+        return best
+
+
+def _window_half(window, coords, size):
+    """Células do bloco 2x2 ocupadas pela peça, como máscara de 4 bits."""
+    r, c = divmod(window, size)
+    half = 0
+    for bit, cell in enumerate(((r, c), (r, c + 1), (r + 1, c), (r + 1, c + 1))):
+        if cell in coords:
+            half |= 1 << bit
+    return half
+
+
+def _recorder(changes):
+    """assign para connectivity.join_piece que guarda os valores antigos em changes."""
+    def assign(container, key, value):
+        changes.append((container, key, container[key]))
+        container[key] = value
+    return assign
+
+
+class ExactCoverSolver:
+    def __init__(self, board):
+        self.board = board
+        self.nodes = 0
+        filled, region_map = board.region_filled, board.region_map
+        primary = [region for region in board.regions if not filled[region]]
+        self.rows = []
+        row_columns = []
+        secondary = {}
+        for region in primary:
+            for placement in board.catalogue.alive(region, board.alive[region]):
+                columns = [region]
+                for r, c in placement.coords:
+                    for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                        if (nr, nc) not in placement.border:
+                            continue
+                        other = region_map[nr][nc]
+                        if other == region or filled[other]:
+                            continue
+                        key = (min((r, c), (nr, nc)), max((r, c), (nr, nc)), placement.letter)
+                        secondary[key] = None
+                        columns.append(key)
+                for window, count in placement.windows:
+                    half = _window_half(window, placement.coords, board.size)
+                    key = (window, min(half, 15 ^ half))
+                    secondary[key] = None
+                    columns.append(key)
+                self.rows.append(placement)
+                row_columns.append(columns)
+        self.links = DancingLinks(primary, list(secondary), row_columns)
+        self.column_of = {region: i + 1 for i, region in enumerate(primary)}
+        # Peça de cada região (0 enquanto está por cobrir) e a primeira colocada,
+        # de onde parte a verificação da conetividade
+        self.pieces = {region: board.graph.masks[region] & board.occupied for region in board.regions}
+        self.start = next((region for region in board.regions if filled[region]), None)
+        # Estado das restrições laterais, inicializado a partir do tabuleiro
+        self.windows = board.windows[:]
+        self.occupied = board.occupied
+        self.parent = board.parent.copy()
+        self.component_size = board.component_size.copy()
+        self.components = board.components
+        self.history = []
+
+    def _fits(self, placement):
+        windows = self.windows
+        return not any(windows[window] + count == 4 for window, count in placement.windows)
+
+    def _select(self, node):
+        links, placement = self.links, self.rows[self.links.row_of[node]]
+        j = links.R[node]
+        while j != node:
+            links.cover(links.C[j])
+            j = links.R[j]
+        for window, count in placement.windows:
+            self.windows[window] += count
+        changes = []
+        merged = join_piece(self.parent, self.component_size, self.board.bits, self.board.region_map,
+                            self.occupied, placement, _recorder(changes))
+        self.history.append((self.occupied, self.components, self.start, changes))
+        self.components += 1 - merged
+        if self.start is None:
+            self.start = placement.region
+        self.occupied |= placement.mask
+        self.pieces[placement.region] = placement.mask
+
+    def _unselect(self, node):
+        links, placement = self.links, self.rows[self.links.row_of[node]]
+        self.occupied, self.components, self.start, changes = self.history.pop()
+        self.pieces[placement.region] = 0
+        for container, key, old in reversed(changes):
+            container[key] = old
+        for window, count in placement.windows:
+            self.windows[window] -= count
+        j = links.L[node]
+        while j != node:
+            links.uncover(links.C[j])
+            j = links.L[j]
+
+    def _can_connect(self):
+        if self.components <= 1:
+            return True
+        placed = self.board.placed + len(self.history)
+        return flood(self.board.graph, self.parent, self.start, self.pieces.__getitem__, self._area)[1] == placed
+
+    def _area(self, region):
+        """Células que as linhas que restam na coluna da região ocupam."""
+        links, rows = self.links, self.rows
+        D, column = links.D, self.column_of[region]
+        union, node = 0, D[column]
+        while node != column:
+            union |= rows[links.row_of[node]].mask
+            node = D[node]
+        return union
+
+    def solve(self):
+        """Devolve a lista de colocações escolhidas, ou None se não houver solução."""
+        links = self.links
+        # As linhas de cada coluna são percorridas de baixo para cima, i.e. da
+        # última colocação do catálogo para a primeira, como no BacktrackSolver
+        U = links.U
+        frames = []
+        descend = True
+        while True:
+            if descend:
+                self.nodes += 1
+                column = links.choose()
+                if not column:
+                    if self.components == 1:
+                        return [self.rows[links.row_of[node]] for _, node in frames]
+                else:
+                    links.cover(column)
+                    frames.append([column, column])
+            if not frames:
+                return None
+            frame = frames[-1]
+            column, node = frame
+            if node != column:
+                self._unselect(node)
+            node = U[node]
+            while node != column and not self._fits(self.rows[links.row_of[node]]):
+                node = U[node]
+            if node == column:
+                links.uncover(column)
+                frames.pop()
+                descend = False
+                continue
+            frame[1] = node
+            self._select(node)
+            # Com componentes que já não se podem juntar não vale a pena descer
+            descend = self._can_connect()
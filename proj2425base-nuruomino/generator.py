@@ -0,0 +1,211 @@
+# generator.py - Gerador de puzzles Nuruomino com solução plantada
+#
+# Uso:
+#     python3 generator.py --size 40 --seed 1 -o ../generated/gen40
+#         escreve ../generated/gen40.txt (o puzzle) e ../generated/gen40.out
+#     python3 generator.py --size 20 --regions 60 --seed 7
+#         escreve o puzzle no stdout
+#
+# Primeiro planta-se a solução: as peças vão sendo colocadas uma a uma, cada
+# nova peça encostada (ortogonalmente) às que já existem, sem encher blocos
+# 2x2 e sem encostar a uma peça da mesma letra. Se a plantação encravar antes
+# de ter todas as peças, recomeça-se (--restarts). A solução fica ligada em 4
+# direções e portanto também em 8 (is_connected). Depois cada peça passa a ser
+# a semente de uma região e as células livres são distribuídas pelas regiões
+# vizinhas por crescimento aleatório, o que dá regiões ortogonalmente ligadas
+# que cobrem o tabuleiro todo.
+
+import argparse
+import os
+import random
+import sys
+
+from placements import ORIENTATIONS
+
+LETTERS = tuple(ORIENTATIONS)
+SHAPES = tuple((letter, tuple((r, c) for r, row in enumerate(orientation)
+                              for c, value in enumerate(row) if value))
+               for letter in LETTERS for orientation in ORIENTATIONS[letter])
+
+
+def _fits(cells, letter, pieces, size):
+    """A peça cabe no tabuleiro sem sobrepor, encher 2x2 ou tocar na mesma letra?"""
+    for r, c in cells:
+        if not (0 <= r < size and 0 <= c < size) or (r, c) in pieces:
+            return False
+    for r, c in cells:
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if pieces.get((nr, nc)) == letter:
+                return False
+        for wr in (r - 1, r):
+            for wc in (c - 1, c):
+                block = ((wr, wc), (wr, wc + 1), (wr + 1, wc), (wr + 1, wc + 1))
+                if all(cell in pieces or cell in cells for cell in block):
+                    return False
+    return True
+
+
+def _shifted(shape, anchor, offset):
+    """Células da forma posta de modo que a sua célula offset fique em anchor."""
+    return tuple((anchor[0] + r - offset[0], anchor[1] + c - offset[1]) for r, c in shape)
+
+
+def _search_anchor(frontier, pieces, size, rng):
+    """Procura exaustiva (em ordem aleatória) de uma peça que cubra uma célula da
+    fronteira. As células onde já nada cabe saem da fronteira de vez: colocar
+    mais peças só tira opções."""
+    rng.shuffle(frontier)
+    while frontier:
+        anchor = frontier[-1]
+        options = [(letter, shape, offset) for letter, shape in SHAPES for offset in shape]
+        rng.shuffle(options)
+        for letter, shape, offset in options:
+            cells = _shifted(shape, anchor, offset)
+            if _fits(cells, letter, pieces, size):
+                return letter, cells
+        frontier.pop()
+    return None, None
+
+
+def _contact(cells, pieces, size):
+    """Nº de lados das células da peça encostados a outras peças ou à borda."""
+    inside = set(cells)
+    contact = 0
+    for r, c in cells:
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if (nr, nc) not in inside and (not (0 <= nr < size and 0 <= nc < size) or (nr, nc) in pieces):
+                contact += 1
+    return contact
+
+
+def plant(size, count, rng, attempts=400, choices=64):
+    """Coloca count peças ligadas. Devolve a lista de (letra, células). De cada
+    vez sorteiam-se até choices peças que cabem e fica a mais encostada (às
+    outras e à borda): as peças ficam juntas e sobram menos buracos onde já
+    nada cabe, o que permite plantar muitas mais."""
+    pieces = {}
+    planted = []
+    frontier = []
+    while len(planted) < count:
+        candidates = []
+        for _ in range(attempts):
+            if frontier:
+                # Uma célula livre encostada a uma peça, e uma forma que a cubra
+                anchor = rng.choice(frontier)
+            elif not planted:
+                anchor = (rng.randrange(size), rng.randrange(size))
+            else:
+                break
+            letter, shape = rng.choice(SHAPES)
+            cells = _shifted(shape, anchor, rng.choice(shape))
+            if _fits(cells, letter, pieces, size):
+                candidates.append((_contact(cells, pieces, size), len(candidates), letter, cells))
+                if len(candidates) == choices:
+                    break
+        if candidates:
+            _, _, letter, cells = max(candidates)
+        else:
+            letter, cells = _search_anchor(frontier, pieces, size, rng)
+            if cells is None:
+                raise ValueError(f"só foi possível plantar {len(planted)} de {count} peças num {size}x{size}")
+        for cell in cells:
+            pieces[cell] = letter
+        planted.append((letter, cells))
+        around = [(r + dr, c + dc) for r, c in cells for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1))]
+        frontier = [(r, c) for r, c in dict.fromkeys(frontier + around)
+                    if 0 <= r < size and 0 <= c < size and (r, c) not in pieces]
+    return planted
+
+
+def grow_regions(size, planted, rng):
+    """Matriz de regiões (inteiros a partir de 1) com uma peça plantada em cada uma."""
+    region_map = [[0] * size for _ in range(size)]
+    frontier = []
+    for region, (_, cells) in enumerate(planted, 1):
+        for r, c in cells:
+            region_map[r][c] = region
+        frontier.extend((region, cell) for cell in cells)
+    while frontier:
+        index = rng.randrange(len(frontier))
+        frontier[index], frontier[-1] = frontier[-1], frontier[index]
+        region, (r, c) = frontier[-1]
+        free = [(nr, nc) for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1))
+                if 0 <= nr < size and 0 <= nc < size and not region_map[nr][nc]]
+        if not free:
+            frontier.pop()
+            continue
+        nr, nc = rng.choice(free)
+        region_map[nr][nc] = region
+        frontier.append((region, (nr, nc)))
+    return region_map
+
+
+def max_regions(size):
+    """Limite superior do nº de peças num size x size: cada bloco 2x2 de uma
+    partição do tabuleiro em blocos disjuntos tem pelo menos uma célula vazia."""
+    return (size * size - (size // 2) ** 2) // 4
+
+
+def generate(size, regions=None, seed=None, restarts=100):
+    """Devolve (puzzle, solução) como matrizes de strings. Se a plantação
+    encravar, recomeça do zero (até restarts vezes) com o mesmo gerador
+    aleatório; lança ValueError se o nº de regiões não for possível."""
+    count = regions or max(1, size * size // 8)
+    if count > max_regions(size):
+        raise ValueError(f"num {size}x{size} cabem no máximo {max_regions(size)} peças, pedidas {count}")
+    rng = random.Random(seed)
+    for _ in range(restarts):
+        try:
+            planted = plant(size, count, rng)
+            break
+        except ValueError as error:
+            failure = error
+    else:
+        raise ValueError(f"{failure} (em {restarts} tentativas)")
+    region_map = grow_regions(size, planted, rng)
+    puzzle = [[str(region) for region in row] for row in region_map]
+    solution = [row[:] for row in puzzle]
+    for letter, cells in planted:
+        for r, c in cells:
+            solution[r][c] = letter
+    return puzzle, solution
+
+
+def write_grid(grid, stream):
+    for row in grid:
+        stream.write("\t".join(row) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um puzzle Nuruomino com solução conhecida.")
+    parser.add_argument('--size', type=int, default=20)
+    parser.add_argument('--regions', type=int, default=None, help="por omissão, size*size/8")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('-o', '--output', metavar='PREFIXO',
+                        help="escreve PREFIXO.txt e PREFIXO.out (por omissão, só o puzzle no stdout)")
+    parser.add_argument('--restarts', type=int, default=100, help="tentativas de plantar a solução")
+    args = parser.parse_args(argv)
+    if args.size < 2:
+        parser.error("--size tem de ser pelo menos 2")
+    if args.regions is not None and args.regions < 1:
+        parser.error("--regions tem de ser pelo menos 1")
+
+    try:
+        puzzle, solution = generate(args.size, args.regions, args.seed, args.restarts)
+    except ValueError as error:
+        parser.error(str(error))
+    if not args.output:
+        write_grid(puzzle, sys.stdout)
+        return 0
+    folder = os.path.dirname(args.output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(args.output + '.txt', 'w') as stream:
+        write_grid(puzzle, stream)
+    with open(args.output + '.out', 'w') as stream:
+        write_grid(solution, stream)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,11 @@
 # helpers.py - Funções auxiliares otimizadas para Nuruomino
+#
+# A geometria (vizinhas de cada célula, fronteiras entre regiões, blocos 2x2)
+# vem de board.topology (ver topology.py), calculada uma vez por puzzle.
+
+import tracing
+
+_trace = tracing.channel('rules')
 
 PIECES = {
     'L': [[1, 0], [1, 0], [1, 1]],
@@ -14,25 +21,17 @@ def is_region_filled(region_id, board):
     return board.region_filled.get(str(region_id), False)
 
 def has_duplicate_adjacent_pieces(board):
-    for r in range(board.size):
-        for c in range(board.size):
-            piece = board.matrix[r][c]
-
-            if piece in PIECES:
-                current_region = board.region_map[r][c]
-
-                # Only check orthogonal neighbors
-                for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                    nr, nc = r + dr, c + dc
-                    if 0 <= nr < board.size and 0 <= nc < board.size:
-                        neighbor_piece = board.matrix[nr][nc]
-                        neighbor_region = board.region_map[nr][nc]
-
-                        if neighbor_piece == piece and neighbor_region != current_region:
-                            print(f"❌ Conflict detected:")
-                            print(f"  - Piece '{piece}' at ({r}, {c}) in region {current_region}")
-                            print(f"  - Adjacent piece '{neighbor_piece}' at ({nr}, {nc}) in region {neighbor_region}")
-                            return True
+    matrix, region_map = board.matrix, board.region_map
+    # Only orthogonal neighbours in different regions
+    for (r, c), (nr, nc) in board.topology.borders:
+        piece = matrix[r][c]
+        if piece in PIECES and matrix[nr][nc] == piece:
+            if _trace.debug:
+                _trace.emit("Conflict detected: piece '%s' at (%d, %d) in region %s, "
+                            "adjacent piece '%s' at (%d, %d) in region %s",
+                            piece, r, c, region_map[r][c],
+                            piece, nr, nc, region_map[nr][nc])
+            return True
     return False
 
 
@@ -42,10 +41,11 @@ def is_connected(board):
     filled = [(r, c) for r in range(board.size) for c in range(board.size) if board.matrix[r][c] in PIECES]
     if not filled:
         return False
+    neighbours, size = board.topology.neighbours8, board.size
     queue, visited = deque([filled[0]]), {filled[0]}
     while queue:
         r, c = queue.popleft()
-        for nr, nc in board.adjacent_positions(r, c):
+        for nr, nc in neighbours[r * size + c]:
             if (nr, nc) not in visited and board.matrix[nr][nc] in PIECES:
                 visited.add((nr, nc))
                 queue.append((nr, nc))
@@ -54,8 +54,9 @@ def is_connected(board):
 
 
 def connects_to_existing(coords, board):
+    neighbours, size = board.topology.neighbours8, board.size
     for r, c in coords:
-        for nr, nc in board.adjacent_positions(r, c):
+        for nr, nc in neighbours[r * size + c]:
             if board.matrix[nr][nc] in PIECES:
                 return True
     return False
@@ -64,10 +65,11 @@ def connects_to_existing(coords, board):
 
 
 def has_filled_2x2_block(board):
-    for r in range(board.size - 1):
-        for c in range(board.size - 1):
-            if all(board.matrix[r+i][c+j] in PIECES for i in range(2) for j in range(2)):
-                return True
+    matrix = board.matrix
+    for r, c in board.topology.corners:
+        if (matrix[r][c] in PIECES and matrix[r][c+1] in PIECES and
+                matrix[r+1][c] in PIECES and matrix[r+1][c+1] in PIECES):
+            return True
     return False
 
 def rotate(piece):
@@ -101,27 +103,3 @@ def get_all_valid_coords(shape, region_cells):
         if all((r, c) in region_set for r, c in coords):
             results.append(coords)
     return results
-
-
-
-def has_filled_2x2_block_after(coords, board, piece_letter):
-    """Verifica se a colocação de uma peça criaria um bloco 2x2 inválido."""
-    affected = set()
-    for r, c in coords:
-        for dr in (-1, 0):
-            for dc in (-1, 0):
-                if 0 <= r+dr < board.size - 1 and 0 <= c+dc < board.size - 1:
-                    affected.add((r+dr, c+dc))
-    for r, c in affected:
-        count = 0
-        for i in range(2):
-            for j in range(2):
-                rr, cc = r+i, c+j
-                if (rr, cc) in coords:
-                    count += 1
-                elif board.matrix[rr][cc] in PIECES:
-                    count += 1
-        if count == 4:
-            print(f"❌ Placing '{piece_letter}' would create 2x2 block at ({r}, {c})")
-            return True
-    return False
\ No newline at end of file
@@ -7,6 +7,11 @@
 # 00000 Nome2
 from search import Problem, Node, depth_first_tree_search, astar_search
 from helpers import *
+from zobrist import cells_hash, matrix_hash
+from topology import Topology
+import tracing
+
+_trace = tracing.channel('actions')
 
 PIECES = {
     'L': [
@@ -44,51 +49,42 @@ class NuruominoState:
         de abertos nas procuras informadas. """
         return self.id < other.id
 
+    def __eq__(self, other):
+        """ Estados com as mesmas peças nas mesmas células são iguais, o que
+        permite às procuras em grafo detetar estados repetidos. """
+        return (isinstance(other, NuruominoState) and
+                self.board.zobrist == other.board.zobrist and
+                self.board.matrix == other.board.matrix)
+
+    def __hash__(self):
+        return self.board.zobrist
+
 class Board:
     """Representação interna de um tabuleiro do Puzzle Nuruomino."""
 
-    def __init__(self, matrix, region_map=None):
+    def __init__(self, matrix, region_map=None, zobrist=None, topology=None):
         self.matrix = matrix
         self.size = len(matrix)
         self.region_map = region_map if region_map is not None else [[cell for cell in row] for row in matrix]
-        self.regions = self._build_regions()
+        # Geometria fixa do puzzle, partilhada com os tabuleiros descendentes (ver topology.py)
+        self.topology = topology if topology is not None else Topology(self.region_map)
+        self.regions = self.topology.regions
         self.region_filled = {region_id: False for region_id in self.regions}
-
-    def _build_regions(self):
-        from collections import defaultdict
-        regions = defaultdict(list)
-        for r in range(self.size):
-            for c in range(self.size):
-                region_id = self.region_map[r][c]  # usar o mapa original
-                regions[region_id].append((r, c))
-        return regions
+        # Hash de Zobrist das peças no tabuleiro (ver zobrist.py)
+        self.zobrist = zobrist if zobrist is not None else matrix_hash(matrix)
 
     def adjacent_regions(self, region:int) -> list:
         """Devolve uma lista das regiões que fazem fronteira com a região enviada no argumento."""
-        
-        result = set()
-        for (r, c) in self.regions[str(region)]:
-            for nr, nc in self.adjacent_positions(r, c):
-                neighbor_region = self.region_map[nr][nc]
-                if neighbor_region != str(region):
-                    result.add(int(neighbor_region))
-        return sorted(result)
+        return sorted(int(other) for other in self.topology.adjacent[str(region)])
     
     def adjacent_positions(self, row:int, col:int) -> list:
         """Devolve as posições adjacentes à região, em todas as direções, incluindo diagonais."""
-        
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1), 
-                  (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        adj = []
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            if 0 <= r < self.size and 0 <= c < self.size:
-                adj.append((r, c))
-        return adj
+        return list(self.topology.neighbours8[row * self.size + col])
 
     def adjacent_values(self, row:int, col:int) -> list:
         """Devolve os valores das celulas adjacentes à região, em todas as direções, incluindo diagonais."""
-        return [self.matrix[r][c] for r, c in self.adjacent_positions(row, col)]
+        matrix = self.matrix
+        return [matrix[r][c] for r, c in self.topology.neighbours8[row * self.size + col]]
     
     def get_value(self, row, col):
         return self.matrix[row][col]
@@ -140,12 +136,13 @@ class Nuruomino(Problem):
                     for coords in all_coords:
                         try:
                             temp_state = self.result(state, (region_id, piece_letter, orientation, coords))
-                            print("\n verificação de ação:")
-                            temp_state.board.print_instance()
-                            print("\n---")
+                            if _trace.trace:
+                                _trace.emit_board(temp_state.board, "verificação de ação:")
                             if not has_filled_2x2_block(temp_state.board):
                                 actions.append((region_id, piece_letter, orientation, coords))
-                                print(f"Adicionada ação: {region_id}, {piece_letter}, {orientation}, {coords}")
+                                if _trace.debug:
+                                    _trace.emit("Adicionada ação: %s, %s, %s, %s",
+                                                region_id, piece_letter, orientation, coords)
                         except:
                             continue
 
@@ -157,18 +154,24 @@ class Nuruomino(Problem):
         das presentes na lista obtida pela execução de
         self.actions(state)."""
 
-        print(f"Aplicar ação: {action}")
+        if _trace.debug:
+            _trace.emit("Aplicar ação: %s", action)
 
-        from copy import deepcopy
         region_id, piece_letter, shape, coords = action
 
-        new_matrix = deepcopy(state.board.matrix)
-        new_region_map = deepcopy(state.board.region_map)
+        # Só as linhas onde a peça cai são copiadas; as outras são partilhadas
+        matrix = state.board.matrix
+        new_matrix = list(matrix)
+        for r in {r for r, _ in coords}:
+            new_matrix[r] = matrix[r][:]
 
         for r, c in coords:
             new_matrix[r][c] = piece_letter
 
-        new_board = Board(new_matrix, new_region_map)
+        # O mapa de regiões e a topologia nunca mudam: são partilhados
+        new_board = Board(new_matrix, state.board.region_map,
+                          state.board.zobrist ^ cells_hash(coords, piece_letter, state.board.size),
+                          state.board.topology)
         new_board.region_filled = state.board.region_filled.copy()
         new_board.region_filled[str(region_id)] = True
 
@@ -189,13 +192,15 @@ class Nuruomino(Problem):
             is_connected(state.board) and
             not has_filled_2x2_block(state.board)
         )
-        print("🎯 Goal test:", result)
+        if _trace.debug:
+            _trace.emit("Goal test: %s", result)
         return result
 
     def h(self, node: Node):
         """Função heuristica utilizada para a procura A*."""
-        # TODO
-        pass
+        # Cada ação preenche exatamente uma região, por isso o nº de regiões
+        # por preencher é o custo exato até um objetivo (admissível)
+        return sum(not filled for filled in node.state.board.region_filled.values())
 
 def apply_forced_moves(problem, state):
     changed = True
@@ -212,11 +217,14 @@ def apply_forced_moves(problem, state):
                 for orientation in get_all_orientations(shape):
                     for coords in get_all_valid_coords(orientation, region_cells):
                         valid_moves.append((region_id, piece_letter, orientation, coords))
-                        print(f"Adicionada ação: {region_id}, {piece_letter}, {orientation}, {coords}")
+                        if _trace.trace:
+                            _trace.emit("Adicionada ação: %s, %s, %s, %s",
+                                        region_id, piece_letter, orientation, coords)
 
             if len(valid_moves) == 1:
                 region_id, letter, shape, coords = valid_moves[0]
-                print(f"✅ Movimento forçado: Região {region_id} recebe {letter}")
+                if _trace.info:
+                    _trace.emit("Movimento forçado: Região %s recebe %s", region_id, letter)
                 state = problem.result(state, (region_id, letter, shape, coords))
                 changed = True
                 break  # recomeça do zero porque o tabuleiro mudou
@@ -227,36 +235,26 @@ def apply_forced_moves(problem, state):
 
 if __name__ == "__main__":
     board = Board.parse_instance()
-    print(board.adjacent_regions(1))
-    print(board.adjacent_regions(3))
-    print(board.adjacent_values(0,0))
+    if _trace.info:
+        _trace.emit("Regiões adjacentes a 1: %s", board.adjacent_regions(1))
+        _trace.emit("Regiões adjacentes a 3: %s", board.adjacent_regions(3))
+        _trace.emit("Valores adjacentes a (0, 0): %s", board.adjacent_values(0, 0))
 
     problem = Nuruomino(board)
 
     s0 = NuruominoState(board)
 
-    print("📄 Estado inicial:")
-    s0.board.print_instance()
-    print("\n---")
+    if _trace.info:
+        _trace.emit_board(s0.board, "Estado inicial:")
 
     s_forced = apply_forced_moves(problem, s0)
 
-    print("📌 Após aplicar movimentos forçados:")
-    s_forced.board.print_instance()
-    print("\n---")
+    if _trace.info:
+        _trace.emit_board(s_forced.board, "Após aplicar movimentos forçados:")
 
     problem.initial = s_forced
 
-    #"""
     goal_node = depth_first_tree_search(problem)
 
-    print("Solution:")
-    goal_node.state.board.print_instance()
-
-    #"""
-
-
-
-
-
-
+    if goal_node:
+        goal_node.state.board.print_instance()
@@ -0,0 +1,246 @@
+# parallel.py - Procura em vários processos, dividindo a árvore junto à raiz
+#
+# O processo principal expande os primeiros níveis da árvore (pela ordem do
+# BacktrackSolver) até ter pelo menos split_factor subárvores por processo, e
+# entrega cada subárvore ao pool como o caminho de ações que lá chega, i.e.
+# pares (região, índice no catálogo). Cada processo constrói o seu problema
+# uma única vez (com a função build, que tem de ser de módulo para o pool a
+# poder usar), aplica o caminho com board.apply e resolve a subárvore com o
+# BacktrackSolver. Quando um processo encontra um objetivo liga um Event
+# partilhado; os outros veem-no (de 256 em 256 chamadas a actions) e desistem
+# da subárvore em que estão.
+#
+# WorkStealingSearch é a versão para árvores desequilibradas, e serve para
+# qualquer Problem de search.py: cada processo faz uma procura em profundidade
+# com a sua pilha de Nodes e, quando há processos parados à espera de
+# trabalho, cede-lhes as entradas mais antigas da pilha (as mais próximas da
+# raiz, que são as que têm mais trabalho por baixo). As entradas passam pela
+# fila partilhada como a sequência de ações desde a raiz (Node.solution()) e
+# quem as recebe refaz os estados com problem.result.
+
+import collections
+import multiprocessing
+import os
+
+from search import InstrumentedProblem, Node
+from backtrack import BacktrackSolver
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellableProblem(InstrumentedProblem):
+    """Problema que desiste (lança Cancelled) quando o Event é ligado."""
+
+    def __init__(self, problem, event, every=256):
+        super().__init__(problem)
+        self.event = event
+        self.every = every
+
+    def _check(self):
+        self.succs += 1
+        if not self.succs % self.every and self.event.is_set():
+            raise Cancelled()
+
+    def actions(self, state):
+        self._check()
+        return self.problem.actions(state)
+
+    def iter_actions(self, state):
+        self._check()
+        return self.problem.iter_actions(state)
+
+
+def _path_key(placement):
+    return placement.region, placement.index
+
+
+def split(problem, target):
+    """Expande a árvore por níveis até haver target subárvores. Devolve
+    (caminhos, solução encontrada pelo caminho ou None, nós expandidos)."""
+    state = problem.initial
+    board = state.board
+    catalogue = board.catalogue
+    paths = [()]
+    nodes = 0
+    while len(paths) < target:
+        deeper = []
+        for path in paths:
+            for region, index in path:
+                board.apply(catalogue.by_region[region][index])
+            nodes += 1
+            if problem.goal_test(state):
+                solution = _solution_of(board)
+                for _ in path:
+                    board.undo()
+                return [], solution, nodes
+            deeper.extend(path + (_path_key(action),) for action in reversed(problem.actions(state)))
+            for _ in path:
+                board.undo()
+        if not deeper:
+            return [], None, nodes
+        paths = deeper
+    return paths, None, nodes
+
+
+def _solution_of(board):
+    """Colocação de cada região (região -> índice no catálogo) num tabuleiro cheio."""
+    return {region: alive.bit_length() - 1 for region, alive in board.alive.items()}
+
+
+_worker = {}
+
+
+def _init_worker(build, args, event):
+    problem = build(*args)
+    _worker['problem'] = problem
+    _worker['cancellable'] = CancellableProblem(problem, event)
+    _worker['event'] = event
+
+
+def _solve_subtree(path):
+    """Resolve uma subárvore no processo do pool. Devolve (solução ou None, nós)."""
+    problem, cancellable, event = _worker['problem'], _worker['cancellable'], _worker['event']
+    if event.is_set():
+        return None, 0
+    state = problem.initial
+    board = state.board
+    depth = len(board.trail)
+    for region, index in path:
+        board.apply(board.catalogue.by_region[region][index])
+    solver = BacktrackSolver(cancellable)
+    solution = None
+    try:
+        if solver.solve(state) is not None:
+            solution = _solution_of(board)
+            event.set()
+    except Cancelled:
+        pass
+    while len(board.trail) > depth:
+        board.undo()
+    return solution, solver.nodes
+
+
+class ParallelSolver:
+    def __init__(self, problem, build, args, workers=None, split_factor=4):
+        """problem: o problema já preparado no processo principal; build(*args)
+        tem de construir um problema igual em cada processo do pool."""
+        self.problem = problem
+        self.build = build
+        self.args = args
+        self.workers = workers or os.cpu_count() or 1
+        self.split_factor = split_factor
+        self.nodes = 0
+
+    def solve(self):
+        """Devolve o Board solução (o do problema, preenchido) ou None."""
+        board = self.problem.initial.board
+        paths, solution, self.nodes = split(self.problem, self.workers * self.split_factor)
+        if solution is None and paths:
+            event = multiprocessing.Event()
+            with multiprocessing.Pool(self.workers, _init_worker, (self.build, self.args, event)) as pool:
+                for found, nodes in pool.imap_unordered(_solve_subtree, paths):
+                    self.nodes += nodes
+                    if found is not None:
+                        solution = found
+                        event.set()
+                        break
+                pool.close()
+                pool.join()
+        if solution is None:
+            return None
+        for region, index in solution.items():
+            if not board.region_filled[region]:
+                board.apply(board.catalogue.by_region[region][index])
+        return board
+
+
+def _replay(problem, actions):
+    node = Node(problem.initial)
+    for action in actions:
+        node = node.child_node(problem, action)
+    return node
+
+
+def _steal_worker(problem, wid, shared, check_every):
+    work, results, stop = shared['work'], shared['results'], shared['stop']
+    pending, idle, queued, counts = shared['pending'], shared['idle'], shared['queued'], shared['counts']
+    work.cancel_join_thread()
+    nodes = 0
+    while True:
+        with idle.get_lock():
+            idle.value += 1
+        actions = work.get()
+        with idle.get_lock():
+            idle.value -= 1
+        if actions is None or stop.is_set():
+            break
+        with queued.get_lock():
+            queued.value -= 1
+        stack = collections.deque([_replay(problem, actions)])
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            if problem.goal_test(node.state):
+                stop.set()
+                results.put(node.solution())
+                break
+            stack.extend(node.expand(problem))
+            if not nodes % check_every:
+                counts[wid] = nodes
+                if stop.is_set():
+                    break
+                # Cede as entradas mais antigas enquanto houver quem espere
+                while len(stack) > 1 and idle.value > queued.value:
+                    with pending.get_lock():
+                        pending.value += 1
+                    with queued.get_lock():
+                        queued.value += 1
+                    work.put(stack.popleft().solution())
+        counts[wid] = nodes
+        with pending.get_lock():
+            pending.value -= 1
+            finished = pending.value == 0
+        if finished and not stop.is_set():
+            # Já não há trabalho em lado nenhum: não há solução
+            stop.set()
+            results.put(None)
+    counts[wid] = nodes
+
+
+class WorkStealingSearch:
+    """Procura em profundidade em árvore (como depth_first_tree_search) repartida
+    por vários processos com roubo de trabalho."""
+
+    def __init__(self, problem, workers=None, check_every=64):
+        self.problem = problem
+        self.workers = workers or os.cpu_count() or 1
+        self.check_every = check_every
+        self.nodes = [0] * self.workers
+
+    def search(self):
+        """Devolve o Node objetivo (refeito a partir da raiz) ou None."""
+        shared = {
+            'work': multiprocessing.Queue(),
+            'results': multiprocessing.Queue(),
+            'stop': multiprocessing.Event(),
+            'pending': multiprocessing.Value('i', 1),
+            'idle': multiprocessing.Value('i', 0),
+            'queued': multiprocessing.Value('i', 1),
+            'counts': multiprocessing.Array('l', self.workers),
+        }
+        shared['work'].put([])
+        processes = [multiprocessing.Process(target=_steal_worker,
+                                             args=(self.problem, wid, shared, self.check_every))
+                     for wid in range(self.workers)]
+        for process in processes:
+            process.start()
+        actions = shared['results'].get()
+        shared['stop'].set()
+        for _ in processes:
+            shared['work'].put(None)
+        for process in processes:
+            process.join()
+        self.nodes = list(shared['counts'])
+        return None if actions is None else _replay(self.problem, actions)
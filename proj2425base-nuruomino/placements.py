@@ -0,0 +1,68 @@
+# placements.py - Catálogo imutável de todas as colocações legais de cada região
+#
+# É construído uma única vez por puzzle (em Board.parse_instance) e partilhado
+# por referência por todos os estados. Cada estado guarda apenas, por região,
+# um inteiro cujos bits indicam que colocações do catálogo continuam vivas.
+# Os blocos 2x2 e a fronteira de cada peça saem das tabelas de topology.py.
+
+from collections import namedtuple
+
+from helpers import PIECES, get_all_orientations, get_all_valid_coords
+from zobrist import cells_hash
+
+Placement = namedtuple('Placement', 'region letter shape coords mask index windows border border_mask zobrist')
+
+ORIENTATIONS = {
+    piece: tuple(tuple(map(tuple, orientation)) for orientation in get_all_orientations(shape))
+    for piece, shape in PIECES.items()
+}
+
+
+def _windows_of(coords, cell_windows, size):
+    """Pares (bloco 2x2, nº de células da peça nesse bloco) para os blocos que a peça toca."""
+    counts = {}
+    for r, c in coords:
+        for window in cell_windows[r * size + c]:
+            counts[window] = counts.get(window, 0) + 1
+    return tuple(counts.items())
+
+
+def _border_of(coords, neighbours4, size):
+    """Células ortogonalmente adjacentes à peça e fora dela."""
+    border = []
+    for r, c in coords:
+        for cell in neighbours4[r * size + c]:
+            if cell not in coords and cell not in border:
+                border.append(cell)
+    return tuple(border)
+
+
+class Catalogue:
+    def __init__(self, topology, bits):
+        size, cell_windows, neighbours4 = topology.size, topology.cell_windows, topology.neighbours4
+        by_region = {}
+        for region_id, region_cells in topology.regions.items():
+            found = []
+            for piece in PIECES:
+                for orientation in ORIENTATIONS[piece]:
+                    for coords in get_all_valid_coords(orientation, region_cells):
+                        coords = tuple(coords)
+                        border = _border_of(coords, neighbours4, size)
+                        found.append(Placement(region_id, piece, orientation, coords,
+                                               bits.mask_of(coords), len(found),
+                                               _windows_of(coords, cell_windows, size), border, bits.mask_of(border),
+                                               cells_hash(coords, piece, size)))
+            by_region[region_id] = tuple(found)
+        self.by_region = by_region
+
+    def initial_alive(self):
+        """Conjunto vivo inicial: todas as colocações de todas as regiões."""
+        return {region_id: (1 << len(found)) - 1 for region_id, found in self.by_region.items()}
+
+    def alive(self, region_id, alive_mask):
+        """Itera as colocações da região cujo bit está ativo em alive_mask, por ordem."""
+        found = self.by_region[region_id]
+        while alive_mask:
+            low = alive_mask & -alive_mask
+            yield found[low.bit_length() - 1]
+            alive_mask ^= low
@@ -0,0 +1,34 @@
+# propagation.py - Forward checking sobre os domínios das regiões
+#
+# O domínio de uma região é o inteiro board.alive[region]: um bit por cada
+# colocação do catálogo que ainda é compatível com o tabuleiro. Depois de uma
+# colocação só as regiões vizinhas (em 8 direções) podem perder colocações,
+# por isso só essas são revistas. Uma colocação que deixa de ser válida nunca
+# volta a sê-lo, logo o domínio só encolhe até ao próximo undo().
+
+
+def revise(board, region):
+    """Remove do domínio da região as colocações que deixaram de ser válidas.
+    Devolve o novo domínio."""
+    alive = board.alive[region]
+    kept = alive
+    occupied = board.occupied
+    for placement in board.catalogue.alive(region, alive):
+        if (placement.mask & occupied or board.creates_2x2(placement) or
+                board.touches_same_letter(placement)):
+            kept ^= 1 << placement.index
+    if kept != alive:
+        board._set(board.alive, region, kept)
+        board._set(board.__dict__, 'domain_sum', board.domain_sum - (alive ^ kept).bit_count())
+        board._bucket(region, alive.bit_count(), kept.bit_count())
+        if not kept:
+            board._set(board.__dict__, 'empty_domains', board.empty_domains + 1)
+    return kept
+
+
+def propagate(board, placement):
+    """Revê os domínios das regiões por preencher vizinhas da peça colocada."""
+    filled = board.region_filled
+    for region in board.graph.neighbours[placement.region]:
+        if not filled[region]:
+            revise(board, region)
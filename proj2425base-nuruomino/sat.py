@@ -0,0 +1,370 @@
+# sat.py - Codificação do Nuruomino em CNF e solver CDCL em Python puro
+#
+# Variáveis:
+#   x_p     - a colocação p (do catálogo) é escolhida
+#   y_c     - a célula c fica preenchida
+#   z_c,L   - a célula c fica com a letra L (só nas células junto a outra região)
+# Cláusulas:
+#   exatamente uma colocação viva por região, y_c <-> OR(x_p : p cobre c),
+#   nenhum bloco 2x2 com as quatro células preenchidas e nenhuma aresta entre
+#   regiões com a mesma letra dos dois lados.
+# A conetividade entra de forma preguiçosa: quando o modelo tem mais de uma
+# componente, junta-se um corte por componente e volta-se a resolver, com as
+# cláusulas aprendidas guardadas. A adjacência é a de is_connected (8 direções).
+#
+# Para exportar a CNF base (sem os cortes) em DIMACS:
+#     python3 sat.py < ../public/test04.txt > test04.cnf
+
+import heapq
+
+
+class CDCLSolver:
+    """CDCL com dois literais vigiados, aprendizagem 1UIP, VSIDS e restarts Luby."""
+
+    def __init__(self, num_vars=0):
+        self.num_vars = 0
+        self.clauses = []
+        self.watches = {}
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.heap = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.increment = 1.0
+        self.ok = True
+        self.conflicts = 0
+        self.decisions = 0
+        self.new_vars(num_vars)
+
+    def new_vars(self, count):
+        for _ in range(count):
+            self.num_vars += 1
+            var = self.num_vars
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[var] = []
+            self.watches[-var] = []
+            heapq.heappush(self.heap, (0.0, var))
+
+    def lit_value(self, lit):
+        value = self.value[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, lits):
+        """Junta uma cláusula (lista de inteiros DIMACS). Pode ser chamado entre solve()s."""
+        if not self.ok:
+            return
+        self._cancel_until(0)
+        clause = []
+        for lit in lits:
+            value = self.lit_value(lit)
+            if value == 1 or -lit in clause:
+                return
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self.ok = False
+        else:
+            self._attach(clause)
+
+    def _attach(self, clause):
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def _assign(self, lit, reason):
+        var = abs(lit)
+        self.value[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def _propagate(self):
+        """Propagação unitária. Devolve o índice da cláusula em conflito, ou None."""
+        clauses, value, watches = self.clauses, self.value, self.watches
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = watches[false_lit]
+            kept = []
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                first_value = value[abs(first)] if first > 0 else -value[abs(first)]
+                if first_value == 1:
+                    kept.append(index)
+                    continue
+                for other in range(2, len(clause)):
+                    lit = clause[other]
+                    if (value[abs(lit)] if lit > 0 else -value[abs(lit)]) != -1:
+                        clause[1], clause[other] = lit, false_lit
+                        watches[lit].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value == -1:
+                        kept.extend(watching[position + 1:])
+                        watches[false_lit] = kept
+                        self.qhead = len(self.trail)
+                        return index
+                    self._assign(first, index)
+            watches[false_lit] = kept
+        return None
+
+    def _bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.num_vars + 1) if not self.value[v]]
+            heapq.heapify(self.heap)
+        elif not self.value[var]:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def _analyze(self, conflict):
+        """Aprendizagem 1UIP. Devolve (cláusula aprendida, nível para onde recuar)."""
+        learnt = [None]
+        seen = set()
+        current = len(self.trail_lim)
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in (clause if lit is None else clause[1:]):
+                var = abs(other)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self._bump(var)
+                    if self.level[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            counter -= 1
+            if not counter:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+        learnt[0] = -lit
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def _cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.value[var] = 0
+            self.reason[var] = None
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def _decide(self):
+        heap, value, activity = self.heap, self.value, self.activity
+        while heap:
+            negative, var = heapq.heappop(heap)
+            if not value[var] and -negative == activity[var]:
+                return var if self.phase[var] else -var
+        return None
+
+    def solve(self):
+        """Devolve o modelo (lista de bools indexada pela variável) ou None se for insatisfazível."""
+        if not self.ok or self._propagate() is not None:
+            self.ok = False
+            return None
+        restart, budget = 1, 100 * _luby(1)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return None
+                learnt, level = self._analyze(conflict)
+                self._cancel_until(level)
+                if len(learnt) == 1:
+                    self._assign(learnt[0], None)
+                else:
+                    self._assign(learnt[0], self._attach(learnt))
+                self.increment /= 0.95
+            elif budget <= 0:
+                restart += 1
+                budget = 100 * _luby(restart)
+                self._cancel_until(0)
+            else:
+                lit = self._decide()
+                if lit is None:
+                    return [value == 1 for value in self.value]
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self._assign(lit, None)
+
+
+def _luby(i):
+    """i-ésimo termo (a partir de 1) da sequência de Luby: 1 1 2 1 1 2 4 ..."""
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Encoding:
+    """CNF de um Board (a partir das colocações vivas de cada região)."""
+
+    def __init__(self, board):
+        self.board = board
+        self.num_vars = 0
+        self.clauses = []
+        self.placements = {}
+        self.cell_var = {}
+        size, region_map = board.size, board.region_map
+        for r in range(size):
+            for c in range(size):
+                self.cell_var[(r, c)] = self._new_var()
+        covering = {cell: [] for cell in self.cell_var}
+        letter_var = {}
+        for region in board.regions:
+            chosen = []
+            for placement in board.catalogue.alive(region, board.alive[region]):
+                var = self._new_var()
+                self.placements[var] = placement
+                chosen.append(var)
+                for cell in placement.coords:
+                    covering[cell].append(var)
+                    self.clauses.append([-var, self.cell_var[cell]])
+                    # Letra da célula, só onde a célula encosta a outra região
+                    r, c = cell
+                    for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                        if 0 <= nr < size and 0 <= nc < size and region_map[nr][nc] != region:
+                            key = (cell, placement.letter)
+                            if key not in letter_var:
+                                letter_var[key] = self._new_var()
+                            self.clauses.append([-var, letter_var[key]])
+                            break
+            self.clauses.append(chosen)
+            self._at_most_one(chosen)
+        for cell, vars_ in covering.items():
+            self.clauses.append([-self.cell_var[cell]] + vars_)
+        for r in range(size - 1):
+            for c in range(size - 1):
+                self.clauses.append([-self.cell_var[(r + i, c + j)] for i in (0, 1) for j in (0, 1)])
+        for (cell, letter), var in letter_var.items():
+            r, c = cell
+            for other in ((r + 1, c), (r, c + 1)):
+                other_var = letter_var.get((other, letter))
+                if other_var and region_map[r][c] != region_map[other[0]][other[1]]:
+                    self.clauses.append([-var, -other_var])
+
+    def _new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def _at_most_one(self, vars_):
+        if len(vars_) <= 6:
+            for i, a in enumerate(vars_):
+                for b in vars_[i + 1:]:
+                    self.clauses.append([-a, -b])
+            return
+        # Codificação sequencial (Sinz): s_i = "alguma das primeiras i foi escolhida"
+        previous = None
+        for i, var in enumerate(vars_):
+            if i == len(vars_) - 1:
+                self.clauses.append([-var, -previous])
+                break
+            current = self._new_var()
+            self.clauses.append([-var, current])
+            if previous:
+                self.clauses.append([-previous, current])
+                self.clauses.append([-var, -previous])
+            previous = current
+
+    def cut(self, model):
+        """Cortes de conetividade para um modelo com peças desligadas (lista vazia se ligado)."""
+        bits = self.board.bits
+        shaded = 0
+        for (r, c), var in self.cell_var.items():
+            if model[var]:
+                shaded |= bits.bit(r, c)
+        cuts = []
+        remaining = shaded
+        while remaining:
+            component = remaining & -remaining
+            while True:
+                grown = (component | bits.neighbours8(component)) & shaded
+                if grown == component:
+                    break
+                component = grown
+            remaining &= ~component
+            if component == shaded:
+                return []
+            cuts.append([-self.cell_var[cell] for cell in bits.cells(component)] +
+                        [self.cell_var[cell] for cell in bits.cells(bits.neighbours8(component))])
+        return cuts
+
+    def write_dimacs(self, stream):
+        stream.write("c Nuruomino: x_p por colocação, y_c por célula (cortes de conetividade não incluídos)\n")
+        for var, placement in self.placements.items():
+            cells = " ".join(f"{r},{c}" for r, c in placement.coords)
+            stream.write(f"c x {var} {placement.region} {placement.letter} {cells}\n")
+        for (r, c), var in self.cell_var.items():
+            stream.write(f"c y {var} {r},{c}\n")
+        stream.write(f"p cnf {self.num_vars} {len(self.clauses)}\n")
+        for clause in self.clauses:
+            stream.write(" ".join(map(str, clause)) + " 0\n")
+
+
+class SatSolver:
+    def __init__(self, board):
+        self.encoding = Encoding(board)
+        self.solver = CDCLSolver(self.encoding.num_vars)
+        for clause in self.encoding.clauses:
+            self.solver.add_clause(clause)
+        self.cuts = 0
+
+    def solve(self):
+        """Devolve as colocações do modelo (uma por região), ou None se não houver solução."""
+        while True:
+            model = self.solver.solve()
+            if model is None:
+                return None
+            cuts = self.encoding.cut(model)
+            if not cuts:
+                return [placement for var, placement in self.encoding.placements.items() if model[var]]
+            self.cuts += len(cuts)
+            for clause in cuts:
+                self.solver.add_clause(clause)
+
+
+if __name__ == "__main__":
+    import sys
+    from teste import Board
+    Encoding(Board.parse_instance()).write_dimacs(sys.stdout)
@@ -10,6 +10,9 @@ import sys
 from collections import deque
 
 from utils import *
+import tracing
+
+_trace = tracing.channel('search')
 
 
 class Problem:
@@ -32,6 +35,13 @@ class Problem:
         iterator, rather than building them all at once."""
         raise NotImplementedError
 
+    def iter_actions(self, state):
+        """Return an iterator over the actions of state in the order a
+        depth-first search tries them, i.e. the reverse of self.actions(state)
+        (the last action pushed on the stack is the first one popped).
+        Override it to produce the actions lazily, one at a time."""
+        return reversed(list(self.actions(state)))
+
     def result(self, state, action):
         """Return the state that results from executing the given
         action in the given state. The action must be one of
@@ -73,7 +83,12 @@ class Node:
     the total path_cost (also known as g) to reach the node. Other functions
     may add an f and h value; see best_first_graph_search and astar_search for
     an explanation of how the f and h values are handled. You will not need to
-    subclass this class."""
+    subclass this class.
+    Nodes use __slots__ (no per-node __dict__), so only the fields below exist;
+    f and h start unset, so that memoize(..., 'f') and memoize(..., 'h') can
+    tell whether they were already computed."""
+
+    __slots__ = ('state', 'parent', 'action', 'path_cost', 'depth', 'f', 'h')
 
     def __init__(self, state, parent=None, action=None, path_cost=0):
         """Create a search tree Node, derived from a parent by an action."""
@@ -81,9 +96,7 @@ class Node:
         self.parent = parent
         self.action = action
         self.path_cost = path_cost
-        self.depth = 0
-        if parent:
-            self.depth = parent.depth + 1
+        self.depth = parent.depth + 1 if parent else 0
 
     def __repr__(self):
         return "<Node {}>".format(self.state)
@@ -96,6 +109,11 @@ class Node:
         return [self.child_node(problem, action)
                 for action in problem.actions(self.state)]
 
+    def iter_expand(self, problem):
+        """Generate the child nodes one at a time, in problem.iter_actions order."""
+        for action in problem.iter_actions(self.state):
+            yield self.child_node(problem, action)
+
     def child_node(self, problem, action):
         """[Figure 3.10]"""
         next_state = problem.result(self.state, action)
@@ -104,15 +122,22 @@ class Node:
 
     def solution(self):
         """Return the sequence of actions to go from the root to this node."""
-        return [node.action for node in self.path()[1:]]
+        node, actions = self, []
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
 
     def path(self):
-        """Return a list of nodes forming the path from the root to this node."""
+        """Return a list of nodes forming the path from the root to this node.
+        Built only on request, by following the parent pointers."""
         node, path_back = self, []
-        while node:
+        while node is not None:
             path_back.append(node)
             node = node.parent
-        return list(reversed(path_back))
+        path_back.reverse()
+        return path_back
 
     # We want for a queue of nodes in breadth_first_graph_search or
     # astar_search to have no duplicated states, so we treat nodes
@@ -210,30 +235,57 @@ def depth_first_tree_search(problem):
         node = frontier.pop()
         explored_count += 1
 
-        print(f"\n[DEBUG] Exploring node #{explored_count}")
-        print(f"→ Depth: {len(node.path())}, State ID: {node.state.id}")
-        print(f"→ Frontier size: {len(frontier)}")
-        print("→ Current board state:")
-        node.state.board.print_instance()
-
-        import time
-        #time.sleep(5)  # Pause 1.5 seconds between steps
-
+        if _trace.debug:
+            _trace.emit("Exploring node #%d, depth %d, state ID %s, frontier size %d",
+                        explored_count, node.depth, node.state.id, len(frontier))
+            if _trace.trace:
+                _trace.emit_board(node.state.board)
 
         if problem.goal_test(node.state):
-            print(f"\n✅ [GOAL FOUND] Total nodes explored: {explored_count}")
+            if _trace.info:
+                _trace.emit("Goal found, total nodes explored: %d", explored_count)
             return node
-        
+
         children = node.expand(problem)
-        print(f"[DEBUG] Expanding node ID {node.state.id}, Generated {len(children)} children.")
+        if _trace.debug:
+            _trace.emit("Expanding node ID %s, generated %d children", node.state.id, len(children))
 
         frontier.extend(children)
 
-    print("\n❌ [FAILURE] No solution found.")
+    if _trace.info:
+        _trace.emit("No solution found, total nodes explored: %d", explored_count)
+    return None
+
+
+def lazy_depth_first_tree_search(problem):
+    """Same search (and same order) as depth_first_tree_search, but the stack
+    holds one child generator per level instead of every child node: siblings
+    are only built when the search backtracks to them."""
+    root = Node(problem.initial)
+    explored_count = 1
+    if problem.goal_test(root.state):
+        return root
+    stack = [root.iter_expand(problem)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        explored_count += 1
+        if _trace.debug:
+            _trace.emit("Exploring node #%d, depth %d, state ID %s, stack size %d",
+                        explored_count, node.depth, node.state.id, len(stack))
+        if problem.goal_test(node.state):
+            if _trace.info:
+                _trace.emit("Goal found, total nodes explored: %d", explored_count)
+            return node
+        stack.append(node.iter_expand(problem))
+    if _trace.info:
+        _trace.emit("No solution found, total nodes explored: %d", explored_count)
     return None
 
 
-def depth_first_graph_search(problem):
+def depth_first_graph_search(problem, explored=None):
     """
     [Figure 3.7]
     Search the deepest nodes in the search tree first.
@@ -241,55 +293,65 @@ def depth_first_graph_search(problem):
     The argument frontier should be an empty queue.
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
+    explored may be a bounded utils.TranspositionTable instead of a set.
     """
     frontier = [(Node(problem.initial))]  # Stack
+    on_frontier = {problem.initial}  # states in frontier, for O(1) membership
 
-    explored = set()
+    explored = set() if explored is None else explored
     while frontier:
         node = frontier.pop()
+        on_frontier.discard(node.state)
         if problem.goal_test(node.state):
             return node
         explored.add(node.state)
-        frontier.extend(child for child in node.expand(problem)
-                        if child.state not in explored and child not in frontier)
+        for child in node.expand(problem):
+            if child.state not in explored and child.state not in on_frontier:
+                frontier.append(child)
+                on_frontier.add(child.state)
     return None
 
 
-def breadth_first_graph_search(problem):
+def breadth_first_graph_search(problem, explored=None):
     """[Figure 3.11]
     Note that this function can be implemented in a
     single line as below:
     return graph_search(problem, FIFOQueue())
+    explored may be a bounded utils.TranspositionTable instead of a set.
     """
     node = Node(problem.initial)
     if problem.goal_test(node.state):
         return node
     frontier = deque([node])
-    explored = set()
+    on_frontier = {node.state}  # states in frontier, for O(1) membership
+    explored = set() if explored is None else explored
     while frontier:
         node = frontier.popleft()
+        on_frontier.discard(node.state)
         explored.add(node.state)
         for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
+            if child.state not in explored and child.state not in on_frontier:
                 if problem.goal_test(child.state):
                     return child
                 frontier.append(child)
+                on_frontier.add(child.state)
     return None
 
 
-def best_first_graph_search(problem, f, display=False):
+def best_first_graph_search(problem, f, display=False, explored=None):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    explored may be a bounded utils.TranspositionTable instead of a set."""
     f = memoize(f, 'f')
     node = Node(problem.initial)
     frontier = PriorityQueue('min', f)
     frontier.append(node)
-    explored = set()
+    explored = set() if explored is None else explored
     while frontier:
         node = frontier.pop()
         if problem.goal_test(node.state):
@@ -302,8 +364,7 @@ def best_first_graph_search(problem, f, display=False):
                 frontier.append(child)
             elif child in frontier:
                 if f(child) < frontier[child]:
-                    del frontier[child]
-                    frontier.append(child)
+                    frontier.append(child)  # replaces the queued node (decrease-key)
     return None
 
 
@@ -443,6 +504,14 @@ def astar_search(problem, h=None, display=False):
     return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
 
 
+def weighted_astar_search(problem, h=None, weight=2, display=False):
+    """Weighted A*: best-first graph search with f(n) = g(n) + weight*h(n).
+    With weight > 1 deeper nodes are preferred; if h is admissible the cost of
+    the solution found is at most weight times the optimal cost."""
+    h = memoize(h or problem.h, 'h')
+    return best_first_graph_search(problem, lambda n: n.path_cost + weight * h(n), display)
+
+
 # ______________________________________________________________________________
 # A* heuristics
 
@@ -1549,6 +1618,10 @@ class InstrumentedProblem(Problem):
         self.succs += 1
         return self.problem.actions(state)
 
+    def iter_actions(self, state):
+        self.succs += 1
+        return self.problem.iter_actions(state)
+
     def result(self, state, action):
         self.states += 1
         return self.problem.result(state, action)
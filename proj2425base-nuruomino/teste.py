@@ -1,5 +1,22 @@
-from search import Problem, Node, depth_first_tree_search
+from search import (Problem, Node, InstrumentedProblem, depth_first_tree_search,
+                    lazy_depth_first_tree_search, depth_first_graph_search,
+                    astar_search, weighted_astar_search, greedy_search)
+from utils import TranspositionTable
 from helpers import *
+from bitboard import geometry, connects
+from placements import Catalogue
+from connectivity import RegionGraph, join_piece, can_still_connect
+from topology import Topology
+from propagation import propagate
+from zobrist import table as zobrist_table
+from backtrack import BacktrackSolver
+from backjump import BackjumpSolver
+from exactcover import ExactCoverSolver
+from sat import SatSolver
+from parallel import ParallelSolver, WorkStealingSearch
+import tracing
+
+_trace = tracing.channel('actions')
 
 PIECES = {
     'L': [[1, 0], [1, 0], [1, 1]],
@@ -8,10 +25,6 @@ PIECES = {
     'S': [[0, 1, 1], [1, 1, 0]]
 }
 
-ORIENTATION_CACHE = {
-    piece: get_all_orientations(shape) for piece, shape in PIECES.items()
-}
-
 class NuruominoState:
     state_id = 0
 
@@ -23,28 +36,178 @@ class NuruominoState:
     def __lt__(self, other):
         return self.id < other.id
 
+    # Dois estados são iguais se os tabuleiros tiverem as mesmas peças nas
+    # mesmas células (ver zobrist.py), para as procuras em grafo
+    def __eq__(self, other):
+        return (isinstance(other, NuruominoState) and
+                self.board.zobrist == other.board.zobrist and
+                self.board.matrix == other.board.matrix)
+
+    def __hash__(self):
+        return self.board.zobrist
+
 class Board:
-    def __init__(self, matrix, region_map=None):
+    def __init__(self, matrix, region_map=None, catalogue=None, graph=None, topology=None):
         self.matrix = matrix
         self.size = len(matrix)
         self.region_map = region_map if region_map else [[cell for cell in row] for row in matrix]
-        self.regions = self._build_regions()
+        self.topology = topology if topology else Topology(self.region_map)
+        self.regions = self.topology.regions
         self.region_filled = {region_id: False for region_id in self.regions}
-
-    def _build_regions(self):
-        from collections import defaultdict
-        regions = defaultdict(list)
-        for r in range(self.size):
-            for c in range(self.size):
-                region_id = self.region_map[r][c]
-                regions[region_id].append((r, c))
-        return regions
+        self.bits = geometry(self.size)
+        self.catalogue = catalogue if catalogue else Catalogue(self.topology, self.bits)
+        self.alive = self.catalogue.initial_alive()
+        self.empty_domains = sum(not alive for alive in self.alive.values())
+        # Regiões por preencher e soma dos seus domínios (para Nuruomino.h)
+        self.unfilled = len(self.regions)
+        self.domain_sum = sum(alive.bit_count() for alive in self.alive.values())
+        # MRV: buckets[n] tem um bit (pela ordem de self.order) por cada região por
+        # preencher com exatamente n colocações vivas, e o bit n de nonempty diz se
+        # buckets[n] tem alguma região (ver smallest_domain)
+        self.order = tuple(self.regions)
+        self.region_bit = {region_id: 1 << index for index, region_id in enumerate(self.order)}
+        self.buckets = [0] * (max(alive.bit_count() for alive in self.alive.values()) + 1)
+        self.nonempty = 0
+        for region_id, alive in self.alive.items():
+            self.buckets[alive.bit_count()] |= self.region_bit[region_id]
+            self.nonempty |= 1 << alive.bit_count()
+        self.graph = graph if graph else RegionGraph(self.topology, self.bits)
+        # Union-find das peças colocadas (ver connectivity.py)
+        self.parent = {region_id: region_id for region_id in self.regions}
+        self.component_size = dict.fromkeys(self.regions, 1)
+        self.components = 0
+        self.placed = 0
+        self.trail = []
+        self.frame = None
+        self.occupied = 0
+        self.letter_masks = dict.fromkeys(PIECES, 0)
+        # Nº de células preenchidas em cada bloco 2x2, indexado pelo canto superior esquerdo
+        self.windows = bytearray(self.size * self.size)
+        self.full_windows = 0
+        self.conflicts = 0
+        self.zobrist = 0
+        for r, row in enumerate(self.matrix):
+            for c, cell in enumerate(row):
+                if cell in PIECES:
+                    self._fill_cell(r, c, cell)
+
+    def place_mask(self, mask, piece):
+        self.occupied |= mask
+        self.letter_masks[piece] |= mask
+
+    def _fill_cell(self, r, c, piece):
+        """Regista uma célula que já vem preenchida na matriz dada ao construtor."""
+        self.place_mask(self.bits.bit(r, c), piece)
+        index = r * self.size + c
+        self.zobrist ^= zobrist_table(self.size)[index][piece]
+        for window in self.topology.cell_windows[index]:
+            self.windows[window] += 1
+            self.full_windows += self.windows[window] == 4
+        # Cada par encostado conta uma vez: só as vizinhas que vêm antes na matriz
+        for nr, nc in self.topology.neighbours4[index]:
+            if ((nr, nc) < (r, c) and self.matrix[nr][nc] == piece and
+                    self.region_map[nr][nc] != self.region_map[r][c]):
+                self.conflicts += 1
+
+    def creates_2x2(self, placement):
+        """Verifica, só nos blocos 2x2 que a peça toca, se algum ficaria cheio."""
+        windows = self.windows
+        return any(windows[window] + count == 4 for window, count in placement.windows)
+
+    def touches_same_letter(self, placement):
+        """Células da fronteira da peça já ocupadas por uma peça igual (0 se nenhuma)."""
+        return placement.border_mask & self.letter_masks[placement.letter]
+
+    def place(self, placement):
+        """Devolve um novo Board com a peça colocada. A topologia (region_map,
+        topology, regions, bits, catalogue, graph) é partilhada por referência e da matriz só
+        são copiadas as linhas onde a peça cai."""
+        from copy import copy
+        child = copy(self)
+        child.trail = []
+        child.matrix = self.matrix[:]
+        for r in {r for r, _ in placement.coords}:
+            child.matrix[r] = child.matrix[r][:]
+        child.letter_masks = self.letter_masks.copy()
+        child.region_filled = self.region_filled.copy()
+        child.alive = self.alive.copy()
+        child.buckets = self.buckets[:]
+        child.windows = self.windows[:]
+        child.parent = self.parent.copy()
+        child.component_size = self.component_size.copy()
+        child._put(placement)
+        return child
+
+    def apply(self, placement):
+        """Coloca a peça neste mesmo Board, guardando no trail o que é preciso para undo()."""
+        self.frame = []
+        self._put(placement)
+        self.trail.append(self.frame)
+        self.frame = None
+
+    def undo(self):
+        """Desfaz a última colocação feita com apply()."""
+        for container, key, old in reversed(self.trail.pop()):
+            container[key] = old
+
+    def _set(self, container, key, value):
+        if self.frame is not None:
+            self.frame.append((container, key, container[key]))
+        container[key] = value
+
+    def _bucket(self, region, old, new):
+        """Passa a região do balde old para o balde new (None: sai dos baldes)."""
+        bit, buckets = self.region_bit[region], self.buckets
+        nonempty = self.nonempty
+        kept = buckets[old] ^ bit
+        self._set(buckets, old, kept)
+        if not kept:
+            nonempty ^= 1 << old
+        if new is not None:
+            self._set(buckets, new, buckets[new] | bit)
+            nonempty |= 1 << new
+        if nonempty != self.nonempty:
+            self._set(self.__dict__, 'nonempty', nonempty)
+
+    def smallest_domain(self):
+        """Região por preencher com menos colocações vivas (a primeira pela ordem
+        das regiões, em caso de empate), ou None se estão todas preenchidas."""
+        nonempty = self.nonempty
+        if not nonempty:
+            return None
+        bucket = self.buckets[(nonempty & -nonempty).bit_length() - 1]
+        return self.order[(bucket & -bucket).bit_length() - 1]
+
+    def _put(self, placement):
+        letter = placement.letter
+        windows = self.windows
+        conflicts = (placement.border_mask & self.letter_masks[letter]).bit_count()
+        if conflicts:
+            self._set(self.__dict__, 'conflicts', self.conflicts + conflicts)
+        for window, count in placement.windows:
+            count += windows[window]
+            self._set(windows, window, count)
+            if count == 4:
+                self._set(self.__dict__, 'full_windows', self.full_windows + 1)
+        region_map = self.region_map
+        self._set(self.__dict__, 'placed', self.placed + 1)
+        merged = join_piece(self.parent, self.component_size, self.bits, region_map,
+                            self.occupied, placement, self._set)
+        self._set(self.__dict__, 'components', self.components + 1 - merged)
+        for r, c in placement.coords:
+            self._set(self.matrix[r], c, letter)
+        self._set(self.__dict__, 'occupied', self.occupied | placement.mask)
+        self._set(self.__dict__, 'zobrist', self.zobrist ^ placement.zobrist)
+        self._set(self.letter_masks, letter, self.letter_masks[letter] | placement.mask)
+        self._set(self.region_filled, placement.region, True)
+        self._set(self.__dict__, 'unfilled', self.unfilled - 1)
+        self._set(self.__dict__, 'domain_sum', self.domain_sum - self.alive[placement.region].bit_count())
+        self._bucket(placement.region, self.alive[placement.region].bit_count(), None)
+        self._set(self.alive, placement.region, 1 << placement.index)
+        propagate(self, placement)
 
     def adjacent_positions(self, row, col):
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1), 
-                      (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        return [(row+dr, col+dc) for dr, dc in directions 
-                if 0 <= row+dr < self.size and 0 <= col+dc < self.size]
+        return list(self.topology.neighbours8[row * self.size + col])
 
     def print_instance(self):
         for row in self.matrix:
@@ -56,154 +219,279 @@ class Board:
         return Board([line.strip().split() for line in stdin])
 
 class Nuruomino(Problem):
-    def __init__(self, board):
+    max_impacts = 200000
+
+    def __init__(self, board, lcv=False):
+        """lcv: ordenar as colocações de cada região pelo impacto (least
+        constraining value) em vez da ordem do catálogo."""
         self.initial = NuruominoState(board)
+        self.lcv = lcv
+        # Cache de impact(), partilhada por todos os estados do problema
+        self.impacts = {}
 
     def actions(self, state):
-        board = state.board
-
-        has_existing_pieces = any(cell in PIECES for row in board.matrix for cell in row)
-
-        # Find unfilled regions
-        unfilled_regions = [r for r in board.regions if not board.region_filled[r]]
-        if not unfilled_regions:
-            return []
-
-        # Heuristic: choose the region with the fewest total placement options
-        region_id = min(
-            unfilled_regions,
-            key=lambda r: sum(
-                len(get_all_valid_coords(orient, board.regions[r]))
-                for piece in PIECES
-                for orient in ORIENTATION_CACHE[piece]
-            )
-        )
-        region_cells = board.regions[region_id]
-
-        connected_actions = []
-        disconnected_actions = []
-
-        for piece in PIECES:
-            for orientation in ORIENTATION_CACHE[piece]:
-                for coords in get_all_valid_coords(orientation, region_cells):
-
-                    # Skip if overlapping existing pieces
-                    if any(board.matrix[r][c] in PIECES for r, c in coords):
-                        print(f"[DEBUG] ❌ Skipping action: {piece} at {coords} — overlaps existing pieces.")
-                        continue
+        return list(self.iter_actions(state))[::-1]
 
+    def iter_actions(self, state):
+        """As mesmas ações de actions(), geradas a pedido e já pela ordem em que a
+        procura em profundidade as tenta (da última para a primeira). Sem lcv
+        a verificação de cada colocação (apply/undo) só é feita quando a
+        procura chega a ela."""
+        board = state.board
+        bits = board.bits
+
+        has_existing_pieces = board.occupied != 0
+
+        if not board.unfilled:
+            return
+
+        # Dead end: some region has no placement left, or the pieces already
+        # placed can no longer be joined
+        if board.empty_domains or not can_still_connect(board):
+            return
+
+        # Heuristic (MRV): choose the region with the fewest placements still alive
+        catalogue = board.catalogue
+        region_id = board.smallest_domain()
+
+        # Every alive placement already fits the current board (see propagation.py);
+        # reject the ones that would wipe out a neighbouring region's domain.
+        # Connected placements are tried first and the disconnected ones are held
+        # back; with lcv each group is ordered by impact (least constraining
+        # first), ties keeping reverse catalogue order
+        lcv = self.lcv
+        held_back = []
+        for placement in reversed(list(catalogue.alive(region_id, board.alive[region_id]))):
+            if lcv:
+                impact = self.impact(board, placement)
+                blocked = impact is None
+            else:
+                board.apply(placement)
+                blocked = board.empty_domains > 0
+                board.undo()
+            if blocked:
+                if _trace.debug:
+                    _trace.emit("Skipping action: %s at %s, blocks another region", placement.letter, placement.coords)
+                continue
 
-                    # Skip if would create an invalid 2x2 block
-                    if has_filled_2x2_block_after(coords, board, piece):
-                        print(f"[DEBUG] ❌ Skipping action: {piece} at {coords} — 2x2 block would be created.")
-                        continue
-
-                    # Simulate the board state after placing the piece
-                    new_matrix = [row[:] for row in board.matrix]
-                    for r, c in coords:
-                        new_matrix[r][c] = piece
-
-                    temp_board = Board(new_matrix, board.region_map)
-                    temp_board.region_filled = board.region_filled.copy()
-                    temp_board.region_filled[str(region_id)] = True
-
-                    # Reject if it causes duplicate adjacent pieces across regions
-                    if has_duplicate_adjacent_pieces(temp_board):
-                        print(f"[DEBUG] ❌ Skipping action: {piece} at {coords} — causes adjacent duplicate.")
-                        continue
-
-                    # Reject if it blocks another region from being completed
-                    if any(
-                        is_region_blocked(rid, temp_board.regions[rid], temp_board)
-                        for rid in temp_board.regions
-                        if not is_region_filled(rid, temp_board)
-                    ):
-                        print(f"[DEBUG] ❌ Skipping action: {piece} at {coords} — blocks another region.")
-                        continue
-
-                    connects = connects_to_existing(coords, board)
-                    if connects or not has_existing_pieces:
-                        connected_actions.append((region_id, piece, orientation, coords))
-                    else:
-                        disconnected_actions.append((region_id, piece, orientation, coords))
-
-        return disconnected_actions + connected_actions
+            connected = connects(bits, placement.mask, board.occupied) or not has_existing_pieces
+            if lcv:
+                held_back.append((not connected, impact, len(held_back), placement))
+            elif connected:
+                yield placement
+            else:
+                held_back.append((True, 0, len(held_back), placement))
+
+        held_back.sort()
+        for _, _, _, placement in held_back:
+            yield placement
+
+    def impact(self, board, placement):
+        """Nº de colocações que a peça tira aos domínios das regiões vizinhas, ou
+        None se deixar alguma sem colocações. Só depende dos domínios (e de quais
+        estão preenchidas) das regiões vizinhas, que são a chave da cache."""
+        neighbours = board.graph.neighbours[placement.region]
+        alive, filled = board.alive, board.region_filled
+        key = (placement.region, placement.index,
+               tuple(alive[region] for region in neighbours),
+               tuple(filled[region] for region in neighbours))
+        impacts = self.impacts
+        if key in impacts:
+            return impacts[key]
+        before = board.domain_sum - alive[placement.region].bit_count()
+        board.apply(placement)
+        impact = None if board.empty_domains else before - board.domain_sum
+        board.undo()
+        if len(impacts) >= self.max_impacts:
+            impacts.clear()
+        impacts[key] = impact
+        return impact
 
 
 
     def result(self, state, action):
-        from copy import deepcopy
-        region_id, piece, _, coords = action
-        new_matrix = deepcopy(state.board.matrix)
-        for r, c in coords:
-            new_matrix[r][c] = piece
-        new_board = Board(new_matrix, deepcopy(state.board.region_map))
-        new_board.region_filled = state.board.region_filled.copy()
-        new_board.region_filled[str(region_id)] = True
-        return NuruominoState(new_board)
+        return NuruominoState(state.board.place(action))
+
+    def h(self, node):
+        """Nº de regiões por preencher: cada ação preenche exatamente uma, por isso
+        é o custo exato até um objetivo (admissível), e infinito se o estado já
+        não tem saída (domínio vazio ou peças que já não se podem ligar). A
+        parcela fracionária, sempre abaixo de 1, desempata a favor dos estados
+        mais fundos e, entre estes, dos que têm menos componentes: como h é exato,
+        g + h é igual em todos os nós e, sem isto, o A* expandiria os estados por
+        largura. Num objetivo a parcela deixa h abaixo de 0, o que continua
+        admissível e o põe à frente dos estados por acabar."""
+        board = node.state.board
+        if board.empty_domains or not can_still_connect(board):
+            return float('inf')
+        if not board.unfilled and board.components != 1:
+            return float('inf')
+        n = len(board.regions)
+        return board.unfilled - 0.5 * (board.placed * (n + 1) - board.components) / (n * (n + 1))
 
     def goal_test(self, state):
         board = state.board
         return (is_filled_correctly(board) and
-                not has_duplicate_adjacent_pieces(board) and
-                is_connected(board) and
-                not has_filled_2x2_block(board))
+                not board.conflicts and
+                not board.full_windows and
+                board.components == 1)
 
 def apply_forced_moves(problem, state):
     changed = True
     while changed:
         changed = False
         board = state.board
-        for region_id, region_cells in board.regions.items():
+        for region_id in board.regions:
             if is_region_filled(region_id, board):
                 continue
-            valid_moves = []
-            for piece_letter in PIECES:
-                for orientation in ORIENTATION_CACHE[piece_letter]:
-                    for coords in get_all_valid_coords(orientation, region_cells):
-                        if any(board.matrix[r][c] in PIECES for r, c in coords):
-                            continue
-                        temp_state = problem.result(state, (region_id, piece_letter, orientation, coords))
-                        if (not has_filled_2x2_block(temp_state.board) and
-                            not has_duplicate_adjacent_pieces(temp_state.board)):
-                            valid_moves.append((region_id, piece_letter, orientation, coords))
-            if len(valid_moves) == 1:
-                region_id, letter, shape, coords = valid_moves[0]
-                state = problem.result(state, (region_id, letter, shape, coords))
+            alive = board.alive[region_id]
+            if alive.bit_count() == 1:
+                placement = board.catalogue.by_region[region_id][alive.bit_length() - 1]
+                state = problem.result(state, placement)
                 changed = True
                 break
     return state
 
 
+# Cada motor devolve o Board solução (ou None) e deixa em problem.nodes o
+# número de nós (ou decisões, no caso do SAT) que explorou.
+
+def _solve_search(problem, search):
+    """Corre uma das procuras de search.py sobre o problema instrumentado."""
+    instrumented = InstrumentedProblem(problem)
+    goal_node = search(instrumented)
+    problem.nodes = instrumented.goal_tests
+    return goal_node.state.board if goal_node else None
+
+
+def solve_dfs(problem):
+    return _solve_search(problem, depth_first_tree_search)
+
+
+def solve_lazy(problem):
+    return _solve_search(problem, lazy_depth_first_tree_search)
+
 
-def is_region_blocked(region_id, region_cells, board):
-    region_set = set(region_cells)
+def solve_graph(problem):
+    return _solve_search(problem, lambda p: depth_first_graph_search(p, TranspositionTable()))
 
-    for piece in PIECES:
-        for orientation in ORIENTATION_CACHE[piece]:
-            for coords in get_all_valid_coords(orientation, region_cells):
-                # Must fit only on empty cells
-                if all(board.matrix[r][c] not in PIECES for r, c in coords):
-                    if not has_filled_2x2_block_after(coords, board, piece):
-                        # 💡 Check for adjacency conflicts *now*, not later
-                        new_matrix = [row[:] for row in board.matrix]
-                        for r, c in coords:
-                            new_matrix[r][c] = piece
-                        temp_board = Board(new_matrix, board.region_map)
-                        temp_board.region_filled = board.region_filled.copy()
-                        temp_board.region_filled[str(region_id)] = True
-                        if not has_duplicate_adjacent_pieces(temp_board):
-                            return False  # Still possible
-    return True  
+
+def solve_astar(problem):
+    return _solve_search(problem, astar_search)
+
+
+def solve_wastar(problem):
+    return _solve_search(problem, lambda p: weighted_astar_search(p, weight=2))
+
+
+def solve_greedy(problem):
+    return _solve_search(problem, greedy_search)
+
+
+def solve_backtrack(problem):
+    solver = BacktrackSolver(problem)
+    solution = solver.solve(problem.initial)
+    problem.nodes = solver.nodes
+    return solution
+
+
+def solve_cbj(problem):
+    solver = BackjumpSolver(problem)
+    solution = solver.solve(problem.initial)
+    problem.nodes = solver.nodes
+    return solution
+
+
+def solve_lcv(problem):
+    # O InstrumentedProblem só reencaminha leituras: a flag vai para o problema real
+    inner = problem
+    while isinstance(inner, InstrumentedProblem):
+        inner = inner.problem
+    inner.lcv = True
+    return solve_backtrack(problem)
+
+
+def solve_dlx(problem):
+    board = problem.initial.board
+    solver = ExactCoverSolver(board)
+    placements = solver.solve()
+    problem.nodes = solver.nodes
+    if placements is None:
+        return None
+    for placement in placements:
+        board.apply(placement)
+    return board
+
+
+def solve_sat(problem):
+    board = problem.initial.board
+    solver = SatSolver(board)
+    placements = solver.solve()
+    problem.nodes = solver.solver.decisions
+    if placements is None:
+        return None
+    for placement in placements:
+        if not board.region_filled[placement.region]:
+            board.apply(placement)
+    return board
+
+
+def build_problem(region_map):
+    """Problema com os movimentos forçados já aplicados (usado em cada processo do pool)."""
+    problem = Nuruomino(Board([row[:] for row in region_map]))
+    problem.initial = apply_forced_moves(problem, problem.initial)
+    return problem
+
+
+def solve_parallel(problem):
+    board = problem.initial.board
+    solver = ParallelSolver(problem, build_problem, (board.region_map,))
+    solution = solver.solve()
+    problem.nodes = solver.nodes
+    return solution
+
+
+def solve_steal(problem):
+    search = WorkStealingSearch(problem)
+    goal_node = search.search()
+    problem.nodes = sum(search.nodes)
+    return goal_node.state.board if goal_node else None
+
+
+SOLVERS = {
+    'backtrack': solve_backtrack,
+    'lcv': solve_lcv,
+    'cbj': solve_cbj,
+    'dfs': solve_dfs,
+    'lazy': solve_lazy,
+    'graph': solve_graph,
+    'astar': solve_astar,
+    'wastar': solve_wastar,
+    'greedy': solve_greedy,
+    'dlx': solve_dlx,
+    'sat': solve_sat,
+    'parallel': solve_parallel,
+    'steal': solve_steal,
+}
+
+
+def solve(board, method='backtrack', stats=None):
+    """Resolve o puzzle com o motor escolhido e devolve o Board solução (ou None).
+    Se stats for um dicionário, fica com o número de nós explorados em stats['nodes']."""
+    problem = Nuruomino(board)
+    problem.initial = apply_forced_moves(problem, problem.initial)
+    solution = SOLVERS[method](problem)
+    if stats is not None:
+        stats['nodes'] = problem.nodes
+    return solution
 
 
 if __name__ == "__main__":
+    import sys
+    method = sys.argv[1] if len(sys.argv) > 1 else 'backtrack'
+    if method not in SOLVERS:
+        sys.exit(f"motor desconhecido: {method} (motores: {', '.join(sorted(SOLVERS))})")
     board = Board.parse_instance()
-    problem = Nuruomino(board)
-    s_forced = apply_forced_moves(problem, NuruominoState(board))
-    print("📌 Após aplicar movimentos forçados:")
-    s_forced.board.print_instance()
-    print("\n---")
-    problem.initial = s_forced
-    goal_node = depth_first_tree_search(problem)
-    goal_node.state.board.print_instance()
+    solution = solve(board, method)
+    if solution is not None:
+        solution.print_instance()
\ No newline at end of file
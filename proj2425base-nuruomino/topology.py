@@ -0,0 +1,51 @@
+# topology.py - Índice da geometria fixa de um puzzle
+#
+# Tudo o que só depende do mapa de regiões (e não das peças colocadas) é
+# calculado uma vez por puzzle, no Board inicial, e partilhado por referência
+# por todos os Boards que dele descendem: as células de cada região, as
+# vizinhas (em 4 e em 8 direções) de cada célula, as regiões vizinhas de cada
+# região, os pares de células ortogonalmente encostadas de regiões diferentes
+# e os blocos 2x2 de cada célula. As tabelas por célula são tuplos planos
+# indexados por r * size + c, e um bloco 2x2 é indexado da mesma forma pelo seu
+# canto superior esquerdo (como Board.windows).
+
+ORTHOGONAL = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+class Topology:
+    def __init__(self, region_map):
+        size = self.size = len(region_map)
+        self.region_map = region_map
+
+        self.regions = {}
+        for r in range(size):
+            for c in range(size):
+                self.regions.setdefault(region_map[r][c], []).append((r, c))
+
+        def around(r, c, directions):
+            return tuple((r + dr, c + dc) for dr, dc in directions
+                         if 0 <= r + dr < size and 0 <= c + dc < size)
+
+        cells = [(r, c) for r in range(size) for c in range(size)]
+        self.neighbours4 = tuple(around(r, c, ORTHOGONAL) for r, c in cells)
+        self.neighbours8 = tuple(around(r, c, ORTHOGONAL + DIAGONAL) for r, c in cells)
+
+        # Blocos 2x2, pelo canto superior esquerdo
+        self.corners = tuple((r, c) for r in range(size - 1) for c in range(size - 1))
+        self.cell_windows = tuple(tuple(wr * size + wc for wr in (r - 1, r) for wc in (c - 1, c)
+                                        if 0 <= wr < size - 1 and 0 <= wc < size - 1)
+                                  for r, c in cells)
+
+        # Pares (célula, célula à direita ou em baixo) de regiões diferentes
+        self.borders = tuple(((r, c), (nr, nc)) for r, c in cells for nr, nc in ((r, c + 1), (r + 1, c))
+                             if nr < size and nc < size and region_map[r][c] != region_map[nr][nc])
+
+        self.adjacent = {}
+        for region_id, region_cells in self.regions.items():
+            touching = set()
+            for r, c in region_cells:
+                touching.update(region_map[nr][nc] for nr, nc in self.neighbours8[r * size + c])
+            # Pela ordem das regiões (a mesma de connectivity.RegionGraph)
+            self.adjacent[region_id] = tuple(other for other in self.regions
+                                             if other != region_id and other in touching)
@@ -0,0 +1,110 @@
+# tracing.py - Traços de depuração com níveis, categorias e amostragem
+#
+# Desligados por omissão. Liga-se pela variável de ambiente NURUOMINO_TRACE:
+#     NURUOMINO_TRACE=debug                    todas as categorias até DEBUG
+#     NURUOMINO_TRACE=search=trace,rules       search até TRACE, rules até DEBUG
+#     NURUOMINO_TRACE=info,actions=off         tudo até INFO menos actions
+# e NURUOMINO_TRACE_SAMPLE=N escreve só 1 em cada N eventos de cada categoria.
+# Os traços vão para stderr: o stdout fica só com o tabuleiro final.
+#
+# Cada módulo pede o seu canal uma vez e, nos pontos quentes, testa um
+# atributo booleano antes de construir a mensagem, por isso com os traços
+# desligados o custo é só esse teste:
+#     _trace = tracing.channel('search')
+#     ...
+#     if _trace.debug:
+#         _trace.emit("nó %d", count)
+
+import os
+import sys
+
+OFF, ERROR, INFO, DEBUG, TRACE = 0, 1, 2, 3, 4
+LEVELS = {'off': OFF, 'error': ERROR, 'info': INFO, 'debug': DEBUG, 'trace': TRACE}
+
+_channels = {}
+_config = {'default': OFF, 'levels': {}, 'sample': 1, 'stream': None}
+
+
+class Channel:
+    def __init__(self, category):
+        self.category = category
+        self.count = 0
+        self.set_level(OFF)
+
+    def set_level(self, level, sample=1):
+        self.level = level
+        self.sample = max(1, sample)
+        self.error = level >= ERROR
+        self.info = level >= INFO
+        self.debug = level >= DEBUG
+        self.trace = level >= TRACE
+
+    def _sampled(self):
+        self.count += 1
+        return (self.count - 1) % self.sample == 0
+
+    def emit(self, message, *args):
+        """Escreve um evento. A mensagem só é formatada (message % args) se for escrita."""
+        if not self._sampled():
+            return
+        if args:
+            message = message % args
+        _write(f"[{self.category}] {message}\n")
+
+    def emit_board(self, board, title=None):
+        """Escreve as linhas de um tabuleiro (conta como um único evento)."""
+        if not self._sampled():
+            return
+        lines = [f"[{self.category}] {title}\n"] if title else []
+        lines.extend("\t".join(str(cell) for cell in row) + "\n" for row in board.matrix)
+        _write("".join(lines))
+
+
+def _write(text):
+    (_config['stream'] or sys.stderr).write(text)
+
+
+def parse_spec(spec):
+    """'info,search=trace' -> (nível por omissão, {categoria: nível})."""
+    default, levels = OFF, {}
+    for item in (spec or '').split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        if '=' in item:
+            category, level = (part.strip() for part in item.split('=', 1))
+            if level not in LEVELS:
+                # Corre ao importar: um nível inválido não pode parar o programa
+                sys.stderr.write(f"NURUOMINO_TRACE: nível desconhecido '{level}' em '{item}', "
+                                 f"{category} fica com o nível por omissão\n")
+                continue
+            levels[category] = LEVELS[level]
+        elif item in LEVELS:
+            default = LEVELS[item]
+        else:
+            levels[item] = DEBUG
+    return default, levels
+
+
+def configure(spec=None, sample=None, stream=None):
+    """Reconfigura todos os canais (os já criados e os futuros)."""
+    default, levels = parse_spec(spec)
+    _config.update(default=default, levels=levels, sample=int(sample or 1), stream=stream)
+    for channel_ in _channels.values():
+        _apply(channel_)
+
+
+def _apply(channel_):
+    level = _config['levels'].get(channel_.category, _config['default'])
+    channel_.set_level(level, _config['sample'])
+
+
+def channel(category):
+    """Canal (partilhado) de uma categoria."""
+    if category not in _channels:
+        _channels[category] = Channel(category)
+        _apply(_channels[category])
+    return _channels[category]
+
+
+configure(os.environ.get('NURUOMINO_TRACE'), os.environ.get('NURUOMINO_TRACE_SAMPLE'))
@@ -724,10 +724,21 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup.
+    Implemented as an indexed binary heap: each entry is [f(x), tie, x], with tie
+    a unique, decreasing insertion counter so that comparing two entries never
+    reaches the items themselves and items with equal f(x) come out last in,
+    first out (best-first search then takes the children of a node in the same
+    order as depth-first search), and
+    self.position maps every item (which must be hashable) to its index in the
+    heap. Membership and lookup are O(1); append, pop, delete and change of
+    priority are O(log n). Items are unique: appending an item equal to one
+    already queued replaces it (and its priority)."""
 
     def __init__(self, order='min', f=lambda x: x):
         self.heap = []
+        self.position = {}
+        self.counter = 0
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -736,8 +747,23 @@ class PriorityQueue:
             raise ValueError("Order must be either 'min' or 'max'.")
 
     def append(self, item):
-        """Insert item at its correct position."""
-        heapq.heappush(self.heap, (self.f(item), item))
+        """Insert item at its correct position (or move it there, if already queued)."""
+        value = self.f(item)
+        if item in self.position:
+            i = self.position.pop(item)
+            entry = self.heap[i]
+            old = entry[0]
+            entry[0], entry[2] = value, item
+            self.position[item] = i
+            if value < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+            return
+        self.counter -= 1
+        self.heap.append([value, self.counter, item])
+        self.position[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
@@ -748,7 +774,7 @@ class PriorityQueue:
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
         if self.heap:
-            return heapq.heappop(self.heap)[1]
+            return self._remove(0)
         else:
             raise Exception('Trying to pop from empty PriorityQueue.')
 
@@ -758,23 +784,93 @@ class PriorityQueue:
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.position
 
     def __getitem__(self, key):
-        """Returns the first value associated with key in PriorityQueue.
+        """Returns the value associated with key in PriorityQueue.
         Raises KeyError if key is not present."""
-        for value, item in self.heap:
-            if item == key:
-                return value
-        raise KeyError(str(key) + " is not in the priority queue")
+        try:
+            return self.heap[self.position[key]][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
 
     def __delitem__(self, key):
-        """Delete the first occurrence of key."""
+        """Delete the occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
-        except ValueError:
+            i = self.position[key]
+        except KeyError:
             raise KeyError(str(key) + " is not in the priority queue")
-        heapq.heapify(self.heap)
+        self._remove(i)
+
+    def _remove(self, i):
+        heap = self.heap
+        item = heap[i][2]
+        del self.position[item]
+        last = heap.pop()
+        if i < len(heap):
+            heap[i] = last
+            self.position[last[2]] = i
+            self._sift_up(i)
+            self._sift_down(self.position[last[2]])
+        return item
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.position[heap[i][2]] = i
+        self.position[heap[j][2]] = j
+
+    def _sift_up(self, i):
+        heap = self.heap
+        while i:
+            parent = (i - 1) >> 1
+            if heap[i] >= heap[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        heap, n = self.heap, len(self.heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[i] <= heap[child]:
+                break
+            self._swap(i, child)
+            i = child
+
+
+class TranspositionTable:
+    """A bounded set with least-recently-used eviction, for use as the explored
+    set of the graph searches. Membership tests and additions both refresh an
+    entry; once maxsize entries are stored the stalest one is dropped, so an
+    evicted state may be expanded again (memory is traded for repeated work)."""
+
+    def __init__(self, maxsize=100000):
+        self.table = collections.OrderedDict()
+        self.maxsize = maxsize
+        self.hits = self.evictions = 0
+
+    def add(self, key):
+        """Insert key (or refresh it), evicting the least recently used entry if full."""
+        self.table[key] = None
+        self.table.move_to_end(key)
+        if len(self.table) > self.maxsize:
+            self.table.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, key):
+        if key in self.table:
+            self.table.move_to_end(key)
+            self.hits += 1
+            return True
+        return False
+
+    def __len__(self):
+        return len(self.table)
 
 
 # ______________________________________________________________________________
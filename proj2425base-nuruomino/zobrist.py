@@ -0,0 +1,43 @@
+# zobrist.py - Hashing de Zobrist dos tabuleiros
+#
+# Cada par (célula, letra) tem uma chave aleatória de 64 bits e o hash de um
+# tabuleiro é o XOR das chaves das células preenchidas. Colocar uma peça é
+# fazer XOR com as chaves das suas quatro células, por isso o hash atualiza-se
+# em O(tamanho da peça). As tabelas são fixas para cada tamanho (semente
+# constante), para que o mesmo tabuleiro tenha sempre o mesmo hash.
+
+import random
+
+from helpers import PIECES
+
+_tables = {}
+
+
+def table(size):
+    """Chaves de cada célula, indexadas por r * size + c e depois pela letra."""
+    if size not in _tables:
+        rng = random.Random(size)
+        _tables[size] = tuple({letter: rng.getrandbits(64) for letter in PIECES}
+                              for _ in range(size * size))
+    return _tables[size]
+
+
+def cells_hash(coords, letter, size):
+    """Parcela do hash correspondente a uma peça (ou a um conjunto de células)."""
+    keys = table(size)
+    value = 0
+    for r, c in coords:
+        value ^= keys[r * size + c][letter]
+    return value
+
+
+def matrix_hash(matrix):
+    """Hash de uma matriz inteira (só para o estado inicial)."""
+    size = len(matrix)
+    keys = table(size)
+    value = 0
+    for r, row in enumerate(matrix):
+        for c, cell in enumerate(row):
+            if cell in PIECES:
+                value ^= keys[r * size + c][cell]
+    return value